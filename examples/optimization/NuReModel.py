@@ -34,6 +34,7 @@ from sys_control import *
 from prepost_process import *
 from eco_analysis import *
 from coupling import *
+from rng_stream import *
 
 inData = dataReader(str(sys.argv[1]))
 inData.read()
@@ -51,6 +52,11 @@ label = inData.label
 dataMode = inData.dataMode
 inFile_Array = inData.inFile_Array
 multiplier = inData.multiplier
+cacheDir = inData.cacheDir
+syn_days = inData.syn_days    # length of synthetic demand (dataMode 1) in days
+syn_step = inData.syn_step    # time step of synthetic demand in min
+time_step = inData.time_step
+resample_mode = inData.resample_mode
 
 #### to be optimized ####
 infile_labels = []
@@ -78,6 +84,9 @@ time_interval = inData.time_interval
 auto_con = inData.auto_con
 # length of the time array
 len_time = inData.len_time
+# seed of random streams, the same seed gives identical weather for all cases and runs
+rng_seed = inData.rng_seed
+streams = rng_stream(rng_seed)
 ###############################################
 
 
@@ -99,9 +108,24 @@ price_h2_base = inData.price_h2_base                     # price of h2 per kg
 if '01' in num_chars:
     ###############################################
     # wind data
+    wind_source = inData.wind_source    # 0 for Rayleigh distribution, 1 for wind column of grid data, 2 for wind_file
+    if wind_source == 1:
+        wind_capacity = inData.wind_capacity    # installed capacity of the wind column, in MW
+    if wind_source == 2:
+        # measured wind data, mapped onto the time of grid data
+        wind_meas = wind_readData()
+        wind_meas._readFile_(inData.wind_file)
+        # time zero (date) and time unit (min) of the wind file, the first date of each data set if not given
+        wind_t0 = np.datetime64(inData.wind_t0,'m') if inData.wind_t0 else None
+        wind_t_scale = inData.wind_t_scale
     v_max = inData.v_max
     v_mean = inData.v_mean
     n_range = inData.n_range
+    air_file = inData.air_file          # measured air temperature and pressure, constant density if empty
+    shear_h_ref = inData.shear_h_ref    # measurement height of wind velocity, no wind shear if 0
+    shear_law = inData.shear_law
+    shear_alpha = inData.shear_alpha
+    shear_z0 = inData.shear_z0
     
     # wind turbine data
     d_wing = inData.d_wing # in m,  wind turbine diameter
@@ -110,6 +134,10 @@ if '01' in num_chars:
     
     cut_in = inData.cut_in
     cut_out = inData.cut_out
+
+    curve_file = inData.curve_file  # manufacturer cp or power curve, IEC curve A if empty
+    curve_type = inData.curve_type
+    turbine_dynamic = inData.turbine_dynamic    # 1 for the rotor inertia model
     
     loc_type = inData.loc_type        # 1 for land wind farm, 0 for off-shore wind farm
     
@@ -129,6 +157,14 @@ if '00' in num_chars:
     # SMR module data
     #P_nominal = 50 # nominal power, in MW
     LF_lim = inData.LF_lim
+    LF_mode = inData.LF_mode    # 0 for base load, 1 for load following
+    LF_min = inData.LF_min      # minimum stable load, fraction of the rated power
+    nu_refuel_cycle = inData.nu_refuel_cycle    # days between refuelling outages of a module, 0 for none
+    nu_refuel_days = inData.nu_refuel_days
+    # start date of the refuelling calendar, shared by all data sets (the first data set if not given)
+    refuel_start = np.datetime64(inData.nu_refuel_start,'m') if inData.nu_refuel_start else None
+    nu_FOR = inData.nu_FOR      # forced outage rate of a module
+    nu_MTTR = inData.nu_MTTR    # mean time to repair in hours
     
     
     # whether first of a kind, 1 for yes, 0 for no
@@ -175,6 +211,7 @@ if '10' in num_chars:
     i0_an = inData.i0_an   # in A/cm^2
     
     iter_max = inData.iter_max # maximum number of iterations
+    pem_table = inData.pem_table    # 1 to interpolate the polarization curve from a shared table
     
     ###############################################
     
@@ -253,8 +290,29 @@ for inFile in inFile_Array:
     ###############################################
     # generate grid demand
     ###############################################
-    data_grid = grid(dataMode,inFile,multiplier)
+    if dataMode == 1:
+        # synthetic demand, a random stream for each data set
+        time_syn = syn_step*np.arange(int(syn_days*1440.0/syn_step))
+        data_grid = grid(dataMode,None,multiplier,time=time_syn,seed=streams.stream('grid',idx))
+    else:
+        data_grid = grid(dataMode,inFile,multiplier,cacheDir)
     data_grid.gen()
+    measured_wind = '01' in num_chars and wind_source == 2
+    if measured_wind:
+        # minutes from the first date of the data set to time zero of the wind file
+        wind_t_offset = 0.0 if wind_t0 is None else \
+                (wind_t0 - data_grid.date[0].astype('datetime64[m]'))/np.timedelta64(1,'m')
+    if time_step > 0.0:
+        if measured_wind:
+            # demand onto a uniform grid over the overlap with the wind data
+            t_wind,v_meas = wind_meas.sorted_data(wind_t_offset,wind_t_scale)
+            t_common = common_time(data_grid.time,t_wind,time_step)
+            data_grid.resample(time_step,resample_mode,t_common[0],t_common[-1])
+            wind_t_offset = wind_t_offset - t_common[0]
+        else:
+            data_grid.resample(time_step,resample_mode)
+    if '01' in num_chars and wind_source == 1:
+        cf_wind = data_grid.capacity_factor('wind',wind_capacity)
     #data_grid.demand_plot()
     time = data_grid.aquire_time()
     P_demand = data_grid.aquire_demand()
@@ -314,7 +372,7 @@ for inFile in inFile_Array:
 
         # nuclear
         if '00' in num_chars:
-            module = SMR_module(nu_P_unit,LF_lim)   # SMR module
+            module = SMR_module(nu_P_unit,LF_lim,LF_min)   # SMR module
             npp = SMR_NPP(n_unit_npp_op)                   # SMR NPP
 
         if '01' in num_chars:
@@ -329,11 +387,18 @@ for inFile in inFile_Array:
             # energy storage and hybrid usage
             h2_sys = h2_system(theta_m,A_m,alpha_an,alpha_cat,i0_an,i0_cat,T_op,P_h2,P_o2,P_h2o,iter_max,\
                                 n_unit_pem_op,pem_P_unit,Pmin_unit,\
-                                m_store)
+                                m_store,pem_table == 1)
         if '00' in num_chars:
             ###############################################
             # modelling a SMR NPP 
             ###############################################
+            if nu_refuel_cycle > 0.0 or nu_FOR > 0.0:
+                # availability of modules: refuelling calendar and forced outages
+                if refuel_start is None:
+                    refuel_start = data_grid.date[0].astype('datetime64[m]')
+                # the calendar runs on absolute dates, each data set has its own phase
+                t0_day = (data_grid.date[0].astype('datetime64[m]') - refuel_start)/np.timedelta64(1,'D')
+                npp.availability(time,nu_refuel_cycle,nu_refuel_days,nu_FOR,nu_MTTR,streams.stream('npp',idx),t0_day)
             p_unit = module.m_power()
             P_nuclear = npp.npp_power(p_unit)
         else:
@@ -341,30 +406,60 @@ for inFile in inFile_Array:
         #print ('nuclear power ',P_nuclear)
 
         if '01' in num_chars:
-            ###############################################
-            # generate wind data during simulation time
-            ###############################################
-            wind = wind_Rayleigh(v_max,v_mean,n_range,time)
-            time,v_wind = wind.genData()  # NOTE:the unit of time is in min #
-            #print (v_wind)
-            #wind.plt_v_dis()
-            #wind.plt_windData()
+            if wind_source == 1:
+                ###############################################
+                # wind turbine output from the wind capacity factor of grid data
+                ###############################################
+                wP_out = list(cf_wind[0:len(time)] * w_P_unit)
+            else:
+                if wind_source == 2:
+                    v_wind = wind_meas.align(time,t_offset=wind_t_offset,t_scale=wind_t_scale)
+                else:
+                    ###############################################
+                    # generate wind data during simulation time
+                    ###############################################
+                    wind = wind_Rayleigh(v_max,v_mean,n_range,time)
+                    # common random numbers: the same wind stream for all cases of a data set
+                    time,v_wind = wind.genData(streams.stream('wind',idx))  # NOTE:the unit of time is in min #
+                    #print (v_wind)
+                    #wind.plt_v_dis()
+                    #wind.plt_windData()
            
-            ###############################################
-            # modelling a windturbine
-            ###############################################
-            # air property
-            airData = air()
-            airData.constant()
-            d_air = airData.density
-            # cp curve
-            cp_curve = cp_IEC()
-            cp_curve.curve_A()
-            #cp_curve.cp_plot()
-            cp_array = cp_curve.cp_array(v_wind)
+                ###############################################
+                # modelling a windturbine
+                ###############################################
+                # air property
+                airData = air()
+                if air_file:
+                    # density series at the hub height
+                    airData.ideal_file(air_file,time,h_hub)
+                else:
+                    airData.constant()
+                d_air = airData.density
+                # wind velocity at the hub height
+                if shear_h_ref > 0.0:
+                    v_wind = w_turbine.v_hub(v_wind,shear_h_ref,shear_law,shear_alpha,shear_z0)
+                # cp curve
+                cp_curve = cp_IEC()
+                # the pchip fit of a manufacturer curve is used between its knots
+                cp_mode = 'pchip' if curve_file else 'step'
+                if curve_file:
+                    # fitted once, cached next to the curve file
+                    # a power curve is converted to cp at a reference density, the mean of a density series
+                    cp_curve.curve_file(curve_file,curve_type,d_wing,float(np.mean(d_air)))
+                else:
+                    cp_curve.curve_A()
+                #cp_curve.cp_plot()
+                #cp_array = cp_curve.cp_array(v_wind)
+                #wP_out = w_turbine.P_output(d_air, time, v_wind, cp_array)
             
-            wP_out = w_turbine.P_output(d_air, time, v_wind, cp_array)
-            #print (wP_out)
+                if turbine_dynamic == 1:
+                    # rotor speed integrated with the moment of inertia of the turbine
+                    wP_out = w_turbine.P_output_dynamic(d_air, time, v_wind, cp_curve.cp_array(v_wind,cp_mode))
+                else:
+                    # turbine power curve tabulated once and shared by all cases and data sets
+                    wP_out = w_turbine.P_output_table(d_air, v_wind, cp_curve, mode=cp_mode)
+                #print (wP_out)
             
             ###############################################
             # modelling a wind farm 
@@ -387,6 +482,12 @@ for inFile in inFile_Array:
             P_pv = [0.0]*len(time)
             P_pv = np.asarray(P_pv)
         
+        if '00' in num_chars and LF_mode == 1:
+            ###############################################
+            # SMR NPP following the demand not covered by renewables
+            ###############################################
+            P_nuclear = npp.npp_dispatch(module,np.asarray(P_demand) - P_windfarm - P_pv,time)
+        
         ####################################################################
         # calculate the power produced from coupled nuclear-renewable system
         ####################################################################
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# File              : NuReModel_stream.py
+# Author            : tzhang
+# Date              : 18.10.2026
+# Last Modified Date: 18.10.2026
+# Last Modified By  : tzhang
+
+"""
+
+a model of coupled nuclear-renewable system balanced window by window
+
+the grid demand is read in windows of one day (grid.stream), the power of the SMR plant and the wind
+farm is calculated for each window, and the hydrogen system and the energy accumulators carry their
+state over the windows (balancing.cal_stream), so the memory does not grow with the length of the data
+
+"""
+import sys
+
+# insert from different path
+sys.path.insert(1, '../../')
+
+# import libraries of package
+from grid import *
+from pem import *
+from windData import *
+from nuclear import *
+from wind_turbine import *
+from material import *
+from sys_control import *
+from rng_stream import *
+
+
+###############################################
+# configration of the hybrid system
+###############################################
+# input for electrical grid
+inFile = 'UK_gridwatch_year2018_Jan.csv'
+multiplier = 0.01
+window = 1440.0     # in min, length of a window
+
+###############################################
+# wind data
+v_max = 28.0
+v_mean = 11.0
+n_range = 40
+
+# wind turbine data
+d_wing = 90 # in m,  wind turbine diameter
+J_turbine = 1.3E7 # in kg.m^2, moment of initia of turbine
+h_hub = 50 # in m, the height of the hub
+P_lim = 2  # in MW, power limit of a turbine
+
+cut_in = 4.0
+cut_out = 25.0
+
+# wind farm data
+w_n_unit = 80
+
+###############################################
+# SMR module data
+P_nominal = 50 # nominal power, in MW
+LF_lim = 0.05
+
+# number of units in the npp
+n_n_unit = 6
+
+###############################################
+# hydrogen cell data
+theta_m = 0.13     # the thickness of membrane, in mm
+A = 16             # the area of the membrane, in cm^2
+T = 80             # in C,
+P_h2 = 1e5
+P_o2 = 1e5
+P_h2o = 2e5
+
+alpha_an = 0.5
+alpha_cat = 0.5
+
+i0_an = 1e-7   # in A/cm^2
+i0_cat = 1e-3  # in A/cm^2
+
+iter_max = 5000 # maximum number of iterations
+
+# pem cluster data
+n_unit_pem = 300
+Pmax_unit = 0.3
+Pmin_unit = 0.05
+
+m_store = 0.0   # initial hydrogen storage, in kg
+
+# seed of random streams (wind data)
+rng_seed = 2018
+
+
+###############################################
+# create modules in the system
+###############################################
+data_grid = grid(0,inFile,multiplier)
+
+module = SMR_module(P_nominal,LF_lim)
+npp = SMR_NPP(n_n_unit)
+
+w_turbine = wind_Turbine(d_wing,J_turbine,h_hub,P_lim,cut_in,cut_out)
+w_farm = wind_farm(w_n_unit)
+cp_curve = cp_IEC()
+cp_curve.curve_A()
+airData = air()
+airData.constant()
+
+h2_sys = h2_system(theta_m,A,alpha_an,alpha_cat,i0_an,i0_cat,T,P_h2,P_o2,P_h2o,iter_max,\
+                    n_unit_pem,Pmax_unit,Pmin_unit,\
+                    m_store,True)
+
+streams = rng_stream(rng_seed)
+n_window = [0]
+
+# power of the coupled nuclear-wind system during a window
+def P_source(time):
+    wind = wind_Rayleigh(v_max,v_mean,n_range,time)
+    time,v_wind = wind.genData(streams.stream('wind',n_window[0]))
+    n_window[0] = n_window[0] + 1
+
+    wP_out = w_turbine.P_output_table(airData.density,v_wind,cp_curve)
+    w_turbine.p_out = []    # no records over the windows
+    P_nuclear = npp.npp_power(module.m_power())
+
+    return P_nuclear + w_farm.pArray(wP_out)
+
+
+###############################################
+# balance the system window by window
+###############################################
+balance_control = balancing()
+e_acc_to_grid,e_acc_to_h2sys,e_acc_from_h2sys,e_acc_net_h2sys,e_acc_abandon,ratio_gridfit = \
+        balance_control.cal_stream(data_grid.stream(window),P_source,h2_sys)
+
+print ('energy to grid ',e_acc_to_grid,' MWh')
+print ('energy to h2 system ',e_acc_to_h2sys,' MWh')
+print ('energy from h2 system ',e_acc_from_h2sys,' MWh')
+print ('energy abandoned ',e_acc_abandon,' MWh')
+print ('ratio fit to the demand ',ratio_gridfit)
+print ('hydrogen stored ',h2_sys.aquire_m(),' kg')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# File              : file_cache.py
+# Author            : tzhang
+# Date              : 18.10.2026
+# Last Modified Date: 18.10.2026
+# Last Modified By  : tzhang
+
+import os
+import numpy as np
+
+"""
+
+a binary cache (inFile.npz) of arrays parsed or derived from an input file, kept next to the file
+    - the cache is valid for a key, the modification time and size of the source file
+      followed by the parameters the arrays were derived with
+    - the cache is written atomically, and skipped if the source directory is read only
+
+"""
+
+# path of the binary cache of a file
+def cache_path(inFile):
+    return inFile+'.npz'
+
+# key of the source file (modification time and size), extended by the parameters of the arrays
+def source_key(inFile,*params):
+    stat = os.stat(inFile)
+
+    return (stat.st_mtime_ns,stat.st_size) + tuple(params)
+
+# load the arrays of the binary cache as a dict, None if no valid cache for the key
+def load_cache(inFile,key):
+    path = cache_path(inFile)
+    try:
+        with np.load(path) as cache:
+            if str(cache['key']) != repr(key):
+                return None
+            arrays = {name: cache[name] for name in cache.files if name != 'key'}
+    except (OSError,ValueError,KeyError):
+        return None
+
+    return arrays
+
+# save arrays (keyword arguments) to the binary cache, with the key
+def save_cache(inFile,key,**arrays):
+    path = cache_path(inFile)
+
+    tmp = path+'.'+str(os.getpid())+'.tmp'
+    try:
+        with open(tmp,'wb') as f:
+            np.savez(f,key=np.array(repr(key)),**arrays)
+        os.replace(tmp,path)
+    except OSError:
+        # the source directory may be read only, run without cache
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+"""
+a class test
+
+np.savetxt('cache_test.txt',np.arange(6.0).reshape(3,2))
+key = source_key('cache_test.txt','test')
+save_cache('cache_test.txt',key,data=np.arange(6.0))
+print (load_cache('cache_test.txt',key))
+"""
@@ -5,76 +5,148 @@
 # Date              : 18.11.2019
 # Last Modified Date: 30.07.2020
 # Last Modified By  : tzhang
-import csv
-from datetime import datetime as dtCal
+import os
+import hashlib
+import itertools
 import numpy as np
 from matplotlib import pyplot as plt
+
+from rng_stream import ar1_process
 """
 
 a module to read grid demand data (in csv format)
-    - to be done: generate a nomalized daily grid data
+    - or generate synthetic grid demand from a nomalized daily, weekly and seasonal load profile
 
 """
 
+# resample values at sorted times onto a uniform time array time_new with time step step (in min)
+#   mode 'interp': linear interpolation at the new time points
+#   mode 'mean': average of the samples in each step [t, t+step), empty steps are interpolated
+def _resample_(time,values,time_new,step,mode):
+    if mode == 'interp':
+        values_new = np.interp(time_new,time,values)
+    elif mode == 'mean':
+        n_step = len(time_new)
+        idx = np.floor((time-time_new[0])/step)
+        inside = (idx >= 0) & (idx <= n_step-1)
+        idx = idx[inside].astype(int)
+        v_sum = np.bincount(idx,weights=values[inside],minlength=n_step)
+        n_sum = np.bincount(idx,minlength=n_step)
+
+        filled = n_sum > 0
+        values_new = np.empty(n_step)
+        values_new[filled] = v_sum[filled]/n_sum[filled]
+        values_new[~filled] = np.interp(time_new[~filled],time_new[filled],values_new[filled])
+    else:
+        raise ValueError('unknown resample mode: '+str(mode))
+
+    return values_new
+
 class grid:
-    def __init__(self,dataMode,inFile=None,multiplier=1.0):
-        self.dataMode = dataMode  # mode for grid data, 0 for read from input file,
-        self.multiplier = float(multiplier)
+    # columns of gridwatch csv files
+    gridwatch_columns = ['id','timestamp','demand','frequency','coal','nuclear','ccgt','wind','pumped',\
+            'hydro','biomass','oil','solar','ocgt','french_ict','dutch_ict','irish_ict','ew_ict','nemo',\
+            'other','north_south','scotland_england']
+
+    def __init__(self,dataMode,inFile=None,multiplier=1.0,cacheDir=None,cacheSize=256,\
+            profile=None,time=None,seed=None):
+        self.dataMode = dataMode  # mode for grid data, 0 for read from input file, 1 for synthetic demand
+        self.multiplier = float(multiplier)  # for synthetic demand, the annual mean demand in MW
         self.inFile = inFile
 
+        # synthetic demand: load profile, time array (in min) and seed of random generator
+        self.profile = profile
+        self.time_syn = time
+        self.seed = seed
+
+        # binary cache of parsed grid data, None for no cache
+        if cacheDir is None:
+            self.cache = None
+        else:
+            self.cache = grid_cache(cacheDir,cacheSize)
+
         # grid data
-        self.date = []
-        self.time = []
-        self.demand = []
+        self.date = np.array([],dtype='datetime64[s]')
+        self.time = np.array([],dtype=float)
+        self.demand = np.array([],dtype=float)
+
+        # time step of the data, in min, None for irregular time steps
+        self.dt = None
+
+        # resample mode of the data, None if not resampled, and the time of the file origin on the current time
+        self.resample_mode = None
+        self.t_origin = 0.0
     
-    # read grid data from csv file
-    def _readData_(self):
-        date = []
-        demand = []
+    # column names and number of header lines of the csv file
+    # files without header line are assumed in the gridwatch column order
+    def _header_(self):
         with open(self.inFile) as csv_file:
-            csv_data = csv.reader(csv_file,delimiter=',')
-            for row in csv_data:
-                date.append(row[1])
-                demand.append(row[2])
-        del date[0]
-        del demand[0]
-#        print (date[-1])
-#        print (demand[-1])
+            header = [name.strip() for name in csv_file.readline().split(',')]
+        if 'timestamp' not in header:
+            return grid.gridwatch_columns, 0
+
+        return header, 1
+
+    # read grid data from csv file, timestamp and demand columns as numpy arrays
+    def _readData_(self):
+        header,skiprows = grid._header_(self)
+        usecols = (header.index('timestamp'),header.index('demand'))
+        data = np.loadtxt(self.inFile,delimiter=',',skiprows=skiprows,usecols=usecols,dtype=str,ndmin=2)
+
+        date = np.char.strip(data[:,0]).astype('datetime64[s]')
+        demand = data[:,1].astype(float)
 
         return date, demand
 
-    # convert date file into time array, in minute
+    # read named columns of the csv file, only the requested columns are parsed
+    # the timestamp column is returned as time array (in min), the others as float arrays
+    # files without header line are assumed in the gridwatch column order
+    def read_columns(self,names):
+        header,skiprows = grid._header_(self)
+
+        for name in names:
+            if name not in header:
+                raise KeyError('column '+str(name)+' not found in '+str(self.inFile))
+
+        usecols = [header.index(name) for name in names]
+        data = np.loadtxt(self.inFile,delimiter=',',skiprows=skiprows,usecols=usecols,dtype=str,ndmin=2)
+
+        columns = {}
+        for i in range(len(names)):
+            if names[i] == 'timestamp':
+                date = np.char.strip(data[:,i]).astype('datetime64[s]')
+                columns[names[i]] = grid._date_time_converter_(self,date)
+            else:
+                columns[names[i]] = data[:,i].astype(float)
+
+        return columns
+
+    # normalized capacity factor of a generation column (e.g. wind) on the time array of the grid data
+    # capacity is the installed capacity in MW of the column
+    def capacity_factor(self,name,capacity):
+        if capacity is None or capacity <= 0.0:
+            raise ValueError('installed capacity of column '+str(name)+' must be positive, in MW')
+
+        columns = grid.read_columns(self,['timestamp',name])
+        time = columns['timestamp']
+        power = columns[name]
+
+        cf = np.clip(power/capacity,0.0,1.0)
+
+        # aggregate as the demand: the same time steps and resample mode
+        time = time + self.t_origin
+        if self.resample_mode is not None:
+            cf = _resample_(time,cf,self.time,self.dt,self.resample_mode)
+        elif self.time.size > 0 and (self.time.size != time.size or not np.array_equal(self.time,time)):
+            cf = np.interp(self.time,time,cf)
+
+        return cf
+
+    # convert date array into time array, in minute (seconds are neglected)
     def _date_time_converter_(self,date):
-        time = []
-        date0 = date[0].split()[0]
-        clock0 = date[0].split()[1]
-
-        year0 = int(date0.split('-')[0])
-        month0 = int(date0.split('-')[1])
-        day0 = int(date0.split('-')[2])
-        hour0 = int(clock0.split(':')[0])
-        minute0 = int(clock0.split(':')[1])
-        second0 = 0
-
-        date_ini = dtCal(year0,month0,day0,hour0,minute0,second0) 
-
-        for data in date:
-            date_curr = data.split()[0]
-            clock_curr = data.split()[1]
-
-            year = int(date_curr.split('-')[0])
-            month = int(date_curr.split('-')[1])
-            day = int(date_curr.split('-')[2])
-            hour = int(clock_curr.split(':')[0])
-            minute = int(clock_curr.split(':')[1])
-            second = 0
-            
-            date_curr = dtCal(year,month,day,hour,minute,second)
-            dTime = date_curr - date_ini
-            
-            # calculate current time in unit minute
-            t_curr = dTime.days*1440 + dTime.seconds/60
-            time.append(t_curr)
+        date = np.asarray(date,dtype='datetime64[s]').astype('datetime64[m]')
+
+        time = (date - date[0])/np.timedelta64(1,'m')
 
         return time
 
@@ -83,25 +155,142 @@ class grid:
         demand = np.asarray(demand,dtype = float)
         demand = demand*self.multiplier
 
-        demand = list(demand)
-
         return demand
 
 
+    # parse grid data from input file
+    def _parse_data_(self):
+        date,demand = grid._readData_(self)
+        time = grid._date_time_converter_(self,date)
+        if self.multiplier != 1.0:
+            demand = grid._demand_scale_(self,demand)
+
+        return date, time, demand
+
+    # load grid data from binary cache, parse and store it on a cache miss
+    def _cached_data_(self):
+        key = self.cache.key(self.inFile,self.multiplier)
+        data = self.cache.load(key)
+
+        if data is None:
+            date,time,demand = grid._parse_data_(self)
+            data = np.vstack((date.astype('int64'),time,demand))
+            self.cache.save(key,data)
+        else:
+            date = np.asarray(data[0],dtype='int64').astype('datetime64[s]')
+            time = data[1]
+            demand = data[2]
+
+        return date, time, demand
+
+    # generate synthetic grid data of one scenario
+    def _synthetic_data_(self):
+        if self.profile is None:
+            profile = load_profile()
+        else:
+            profile = self.profile
+
+        if self.time_syn is None or np.ndim(self.time_syn) != 1:
+            raise ValueError('synthetic grid data (dataMode 1) needs the time array in min: grid(1,...,time=time)')
+
+        time = np.asarray(self.time_syn,dtype=float)
+        rng = np.random.default_rng(self.seed)
+
+        demand = profile.gen(time,1,rng)[0] * self.multiplier
+        date = profile.date0 + (time*60.0).astype('timedelta64[s]')
+
+        return date, time, demand
+
     # generate grid data
     def gen(self):
-        if self.dataMode == 0:
-            date,demand = grid._readData_(self)
-            time = grid._date_time_converter_(self,date)
-            if self.multiplier != 1.0:
-                demand = grid._demand_scale_(self,demand)
+        if self.dataMode == 0 and self.cache is not None:
+            date,time,demand = grid._cached_data_(self)
+        elif self.dataMode == 0:
+            date,time,demand = grid._parse_data_(self)
         else:
-            # to be imporved
-            pass
+            date,time,demand = grid._synthetic_data_(self)
+
+        self.date = np.concatenate((self.date,date))
+        self.time = np.concatenate((self.time,time))
+        self.demand = np.concatenate((self.demand,demand))
+
+    # resample grid data to a uniform time step (in min), mode 'interp' or 'mean' (see _resample_)
+    #   t_start, t_end: first and last new time point (e.g. from windData.common_time), the data range if not given;
+    #   the new time starts at the origin of the data again (time[0]), the dates follow t_start
+    def resample(self,step,mode='mean',t_start=None,t_end=None):
+        step = float(step)
+        if step <= 0.0:
+            raise ValueError('time step must be positive')
+
+        time = np.asarray(self.time,dtype=float)
+        demand = np.asarray(self.demand,dtype=float)
+
+        t_start = time[0] if t_start is None else float(t_start)
+        t_end = time[-1] if t_end is None else float(t_end)
+        if t_end < t_start or t_start > time[-1] or t_end < time[0]:
+            raise ValueError('resample range outside the grid data')
+
+        n_step = int(np.floor((t_end-t_start)/step)) + 1
+        time_new = t_start + step*np.arange(n_step)
+
+        demand_new = _resample_(time,demand,time_new,step,mode)
 
-        self.date = self.date + date
-        self.time = self.time + time
-        self.demand = self.demand + demand
+        if self.date.size > 0:
+            # the same origin as time: the first date truncated to the minute
+            date0 = self.date[0].astype('datetime64[m]').astype('datetime64[s]')
+            self.date = date0 + ((time_new-time[0])*60.0).astype('timedelta64[s]')
+        self.time = time_new - (t_start - time[0])
+        self.demand = demand_new
+        self.dt = step
+        self.resample_mode = mode
+        self.t_origin = self.t_origin - (t_start - time[0])
+
+    # stream grid data from input file in windows of fixed length (in min), one array pair per window
+    # the file is read chunkRows lines at a time, so memory is bounded by the window and the chunk size
+    def stream(self,window=10080.0,chunkRows=50000):
+        window = float(window)
+
+        date0 = None
+        t_end = window
+
+        time_buf = np.array([],dtype=float)
+        demand_buf = np.array([],dtype=float)
+
+        header,skiprows = grid._header_(self)
+        usecols = (header.index('timestamp'),header.index('demand'))
+
+        with open(self.inFile) as csv_file:
+            for i in range(skiprows):
+                next(csv_file)      # skip header
+            while True:
+                rows = list(itertools.islice(csv_file,chunkRows))
+                if len(rows) == 0:
+                    break
+
+                data = np.loadtxt(rows,delimiter=',',usecols=usecols,dtype=str,ndmin=2)
+                date = np.char.strip(data[:,0]).astype('datetime64[m]')
+                demand = data[:,1].astype(float)
+
+                if date0 is None:
+                    date0 = date[0]
+                time = (date - date0)/np.timedelta64(1,'m')
+                if self.multiplier != 1.0:
+                    demand = grid._demand_scale_(self,demand)
+
+                time_buf = np.concatenate((time_buf,time))
+                demand_buf = np.concatenate((demand_buf,demand))
+
+                # send all the windows completed by the current chunk
+                while time_buf[-1] >= t_end:
+                    n_win = np.searchsorted(time_buf,t_end)
+                    if n_win > 0:
+                        yield time_buf[:n_win], demand_buf[:n_win]
+                    time_buf = time_buf[n_win:]
+                    demand_buf = demand_buf[n_win:]
+                    t_end = t_end + window
+
+        if time_buf.size > 0:
+            yield time_buf, demand_buf
 
     # plot grid demand data
     def demand_plot(self):
@@ -121,6 +310,10 @@ class grid:
     def aquire_time(self):
         return self.time
 
+    # aquire time step, None for irregular time steps
+    def aquire_dt(self):
+        return self.dt
+
     # aquire demand data
     def aquire_demand(self):
         return self.demand
@@ -146,6 +339,170 @@ class grid:
 
 
 
+"""
+
+a normalized load profile (mean value 1.0 over a year) for synthetic grid demand
+    - shorter periods keep the seasonal level, e.g. about 1.15 for a week in January
+    - daily shape: a typical hourly shape, night valley and evening peak
+    - weekly shape: reduced demand on weekends
+    - seasonal shape: a cosine with winter peak
+    - noise: AR(1) process, correlated in time, independent between scenarios
+
+"""
+class load_profile:
+    # typical hourly daily shape (night valley, day plateau, evening peak), zero mean and peak of 1.0
+    h_day = np.arange(24.0)
+    s_day = np.array([0.80,0.76,0.73,0.71,0.70,0.72,0.80,0.92,1.02,1.06,1.07,1.07,\
+                    1.06,1.05,1.04,1.04,1.08,1.15,1.17,1.14,1.08,1.00,0.92,0.85])
+    s_day = (s_day - s_day.mean())/(s_day.max() - s_day.mean())
+
+    def __init__(self,a_day=0.15,a_week=0.08,a_season=0.15,sigma=0.02,phi=0.98,\
+            d_peak=15,date0='2018-01-01T00:00'):
+        self.a_day = a_day          # amplitude of the daily variation
+        self.a_week = a_week        # relative reduction of demand at weekends
+        self.a_season = a_season    # amplitude of the seasonal variation
+        self.sigma = sigma          # standard deviation of the noise
+        self.phi = phi              # AR(1) correlation of the noise between time steps
+        self.d_peak = d_peak        # day of year of the seasonal peak demand
+
+        self.date0 = np.datetime64(date0,'s')   # date of time zero
+
+    # deterministic part of the profile on a time array (in min)
+    def shape(self,time):
+        time = np.asarray(time,dtype=float)
+
+        t_day = time/1440.0 + (self.date0 - self.date0.astype('datetime64[Y]'))/np.timedelta64(1,'D')
+        hour = (t_day % 1.0) * 24.0
+        # day of week, 0 for Monday (1970-01-01 is a Thursday)
+        weekday = (np.floor(time/1440.0) + (self.date0.astype('datetime64[D]').astype('int64') + 3)) % 7
+
+        s_day = np.interp(hour,load_profile.h_day,load_profile.s_day,period=24.0)
+        # weekends are a_week lower than weekdays, weekly mean kept as 1.0
+        s_week = np.where(weekday >= 5, -self.a_week*5.0/7.0, self.a_week*2.0/7.0)
+        s_season = np.cos(2*np.pi*(t_day-self.d_peak)/365.0)
+
+        shape = 1.0 + self.a_day*s_day + s_week + self.a_season*s_season
+
+        return shape
+
+    # AR(1) noise of n_scenario scenarios, correlated in time, independent between scenarios
+    def _noise_(self,n_scenario,n_time,rng):
+        noise = self.sigma * ar1_process(rng.standard_normal((n_scenario,n_time)),self.phi)
+
+        return noise
+
+    # generate normalized demand of n_scenario scenarios on a time array (in min), shape (n_scenario, n_time)
+    def gen(self,time,n_scenario=1,rng=None):
+        if rng is None or isinstance(rng,(int,np.integer)):
+            rng = np.random.default_rng(rng)
+
+        shape = load_profile.shape(self,time)
+        noise = load_profile._noise_(self,n_scenario,len(shape),rng)
+
+        demand = shape[np.newaxis,:] * (1.0 + noise)
+        demand = np.maximum(demand,0.0)
+
+        return demand
+
+
+"""
+
+a size bounded on-disk cache of parsed grid data (least recently used entries are evicted)
+    - entries are keyed by the content hash of the input file and the multiplier
+    - each entry is a .npy array of (date in s, time in min, demand), loaded as memory map
+
+"""
+class grid_cache:
+    # version of the parsed data, part of the key, entries of other versions are not used
+    version = 2
+
+    def __init__(self,cacheDir,cacheSize=256):
+        self.cacheDir = cacheDir                # directory of the cache files
+        self.cacheSize = cacheSize*1024**2      # maximum size of the cache, in MB
+
+        try:
+            os.makedirs(self.cacheDir,exist_ok=True)
+        except OSError:
+            # a read only location, entries are neither loaded nor saved
+            pass
+
+    # cache key from the content of the input file, the multiplier and the version of the parsed data
+    def key(self,inFile,multiplier):
+        sha = hashlib.sha1()
+        with open(inFile,'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        sha.update(repr(float(multiplier)).encode())
+        sha.update(repr(grid_cache.version).encode())
+
+        return sha.hexdigest()
+
+    # path of a cache entry
+    def _path_(self,key):
+        return os.path.join(self.cacheDir,key+'.npy')
+
+    # load a cache entry as memory map, None if not cached
+    def load(self,key):
+        path = grid_cache._path_(self,key)
+        try:
+            data = np.load(path,mmap_mode='r')
+        except (OSError,ValueError):
+            return None
+
+        # mark the entry as recently used, not possible in a read only or shared cache
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return data
+
+    # store a cache entry and keep the cache within its size limit
+    def save(self,key,data):
+        path = grid_cache._path_(self,key)
+        tmp = path+'.'+str(os.getpid())+'.tmp'
+        try:
+            with open(tmp,'wb') as f:
+                np.save(f,np.asarray(data,dtype=float))
+            os.replace(tmp,path)
+        except OSError:
+            # the cache directory may be read only, run without cache
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        grid_cache._evict_(self,keep=path)
+
+    # remove least recently used entries until the cache fits its size limit
+    def _evict_(self,keep=None):
+        entries = []
+        try:
+            names = os.listdir(self.cacheDir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.npy'):
+                path = os.path.join(self.cacheDir,name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime,stat.st_size,path))
+
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        for mtime,nbytes,path in entries:
+            if size <= self.cacheSize:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size = size - nbytes
+
+
 """
 a class test
 
@@ -162,4 +519,24 @@ uk_grid.demand_plot()
 print (uk_grid.date)
 print (uk_grid.time)
 print (uk_grid.demand)
+
+# synthetic demand of the same mean value, 5 min time step in Jan
+time = np.arange(0.0,31*1440.0,5.0)
+syn_grid = grid(1,multiplier=uk_grid.demand.mean(),time=time,seed=1)
+syn_grid.gen()
+
+# 200 scenarios of normalized demand at once
+demand = load_profile().gen(time,200,np.random.default_rng(1))
+
+# gridwatch wind generation as normalized capacity factor
+cf_wind = uk_grid.capacity_factor('wind',13000.0)
+
+# resample to a uniform time step of 5 min
+uk_grid.resample(5.0,'mean')
+print (uk_grid.aquire_dt())
+
+# stream the data week by week
+window = 7*24*60   # in min
+for time, demand in uk_grid.stream(window):
+    print (time[0], time[-1], demand.max())
 """
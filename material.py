@@ -6,10 +6,15 @@
 # Last Modified Date: 17.08.2020
 # Last Modified By  : tzhang
 
+import numpy as np
+
 # a library for material properties
 
 # air properties (constant or calculated by ideal gas equation)
 class air:
+    R_air = 287.05      # in J/(kg.K), specific gas constant of dry air
+    g = 9.80665         # in m/s^2, gravitational acceleration
+
     def __init__(self):
         self.density = 0.0
 
@@ -19,5 +24,24 @@ class air:
 
         self.density = self.density+density
 
-    def ideal(self):
-        pass
+    # air density by ideal gas equation, T in degC and p in Pa, scalars or arrays of any shape (e.g. time series)
+    # dh: height above the measurement of p (e.g. the hub height), the pressure is corrected by the barometric formula
+    def ideal(self,T=20.0,p=101325.0,dh=0.0):
+        T_K = np.asarray(T,dtype=float) + 273.15
+        p = np.asarray(p,dtype=float)*np.exp(-air.g*dh/(air.R_air*T_K))
+        density = p/(air.R_air*T_K)
+
+        self.density = self.density+density
+
+    # air density from measured data in inFile (comma separated columns: time in min, T in degC, p in Pa),
+    # interpolated to time
+    def ideal_file(self,inFile,time,dh=0.0):
+        try:
+            data = np.loadtxt(inFile,delimiter=',',usecols=(0,1,2),ndmin=2)
+        except ValueError:
+            data = np.loadtxt(inFile,delimiter=',',usecols=(0,1,2),ndmin=2,skiprows=1)
+
+        T = np.interp(time,data[:,0],data[:,1])
+        p = np.interp(time,data[:,0],data[:,2])
+
+        air.ideal(self,T,p,dh)
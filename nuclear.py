@@ -8,14 +8,17 @@
 
 """
 
-a simple SMR model: working as base load
+a simple SMR model: working as base load, or following load under the ramp limit
 
 """
 
+import numpy as np
+
 class SMR_module:
-    def __init__(self,P_nominal,LF_lim=None):
+    def __init__(self,P_nominal,LF_lim=None,P_min=0.0):
         self.P_nominal = P_nominal
         self.LF_lim = LF_lim        # percentage/min, i.g. 0.05 5%/min
+        self.P_min = P_min          # minimum stable load, fraction of P_nominal
 
     # module output 
     def m_power(self):
@@ -24,14 +27,131 @@ class SMR_module:
 class SMR_NPP:
     def __init__(self,n_unit):
         self.n_unit = n_unit
+        self.avail = None       # availability of modules (modules x time, uint8, 1 for available), None for always
 
-    # npp power ouput
+    # npp power ouput, an array over time if the availability of modules is set
     def npp_power(self,p_unit):
-        npp_power = p_unit * self.n_unit
+        if self.avail is None:
+            npp_power = p_unit * self.n_unit
+        else:
+            npp_power = p_unit * SMR_NPP.n_available(self)
+
+        return npp_power
+
+    # number of available modules at each time step
+    def n_available(self):
+        return np.sum(self.avail,axis=0,dtype=np.int64)
+
+    # availability of modules at time (in min), from a refuelling calendar and forced outages
+    #   refuel_cycle: days between refuelling outages of a module (0 for none), refuel_days: length of an outage,
+    #   modules are refuelled in turn, module k starts its first cycle k*refuel_cycle/n_unit days late,
+    #   t0_day is the day of the refuelling calendar at time 0 (data sets starting at different dates)
+    #   FOR: forced outage rate (fraction of time), MTTR: mean time to repair in hours,
+    #   up and down times are exponentially distributed (alternating renewal process)
+    def availability(self,time,refuel_cycle=0.0,refuel_days=0.0,FOR=0.0,MTTR=72.0,rng=None,t0_day=0.0):
+        if not isinstance(rng,np.random.Generator):
+            rng = np.random.default_rng(rng)
+
+        time = np.asarray(time,dtype=float)
+        t_day = time/1440. + t0_day
+        avail = np.ones((self.n_unit,len(time)),dtype=np.uint8)
+
+        if refuel_cycle > 0.0 and refuel_days > 0.0:
+            offset = refuel_cycle*np.arange(self.n_unit)/self.n_unit
+            phase = np.mod(t_day[None,:] - offset[:,None] + refuel_cycle,refuel_cycle)
+            avail[phase >= refuel_cycle - refuel_days] = 0
+
+        if FOR > 0.0:
+            avail &= SMR_NPP._forced_outage_(self,time,FOR,MTTR,rng)
+
+        self.avail = avail
+
+        return avail
+
+    # forced outage states (modules x time, 1 for up) of an alternating renewal process
+    def _forced_outage_(self,time,FOR,MTTR,rng):
+        t_hour = (time - time[0])/60.
+        span = t_hour[-1] + 1.0 if len(t_hour) > 0 else 1.0
+        MTTF = MTTR*(1.0 - FOR)/FOR
+
+        # alternating up and down times, enough cycles to cover the period
+        n_cycle = int(2*span/(MTTF + MTTR)) + 10
+        while True:
+            up = rng.exponential(MTTF,(self.n_unit,n_cycle))
+            down = rng.exponential(MTTR,(self.n_unit,n_cycle))
+            # the first state is up with probability 1-FOR
+            start_down = rng.random(self.n_unit) < FOR
+            durations = np.stack((up,down),axis=-1).reshape(self.n_unit,2*n_cycle)
+            durations[start_down,0] = 0.0
+            bounds = np.cumsum(durations,axis=1)
+            if np.all(bounds[:,-1] > span):
+                break
+            n_cycle = 2*n_cycle
+
+        # one search for all modules: rows are shifted apart on a single axis
+        bounds = np.minimum(bounds,span)
+        shift = 2.0*span*np.arange(self.n_unit)
+        flat = (bounds + shift[:,None]).ravel()
+        query = t_hour[None,:] + shift[:,None]
+        idx = np.searchsorted(flat,query,side='right') - (2*n_cycle)*np.arange(self.n_unit)[:,None]
+
+        # an even number of passed bounds means up
+        return (idx % 2 == 0).astype(np.uint8)
+
+    # npp power output following P_target (e.g. demand minus renewables), time in min
+    #   the output stays between the minimum stable load and the rated power of all modules,
+    #   and changes at most LF_lim of the rated power per minute (LF_lim None for no ramp limit)
+    #   P_target can be a matrix (scenario x time), P_ini is the output before the first step
+    def npp_dispatch(self,module,P_target,time,P_ini=None):
+        P_target = np.asarray(P_target,dtype=float)
+        time = np.asarray(time,dtype=float)
+
+        # rated power of the available modules
+        P_max = module.P_nominal * np.broadcast_to(SMR_NPP.npp_power(self,1.0),time.shape).astype(float)
+        P_low = module.P_min * P_max
+
+        # ramp limit of each step, the first step starts from P_ini
+        if module.LF_lim is None:
+            ramp = np.full(P_target.shape[-1],np.inf)
+        elif module.LF_lim <= 0.0:
+            raise ValueError('LF_lim must be positive for load following, None for no ramp limit')
+        else:
+            ramp = module.LF_lim * P_max * np.diff(time,prepend=time[0])
+
+        target = np.clip(P_target,P_low,P_max)
+        if P_ini is None:
+            P_ini = target[...,0]
+        P_ini = np.clip(np.broadcast_to(P_ini,target.shape[:-1]),P_low[0],P_max[0])
+
+        npp_power = np.empty(target.shape)
+        for idx in np.ndindex(target.shape[:-1]):
+            npp_power[idx] = _ramp_track_(target[idx],ramp,P_low,P_max,float(P_ini[idx]))
 
         return npp_power
 
 
+# follow the target series with steps limited by ramp, a sequential kernel on python floats
+#   (numpy scalar operations in the loop are several times slower)
+#   the output jumps to the bounds when they change (module outage or return)
+def _ramp_track_(target,ramp,P_low,P_max,p):
+    out = []
+    append = out.append
+    for x,r,lo,hi in zip(target.tolist(),ramp.tolist(),P_low.tolist(),P_max.tolist()):
+        if x > p + r:
+            p = p + r
+        elif x < p - r:
+            p = p - r
+        else:
+            p = x
+        if p > hi:
+            p = hi
+        elif p < lo:
+            p = lo
+        append(p)
+
+    return np.array(out)
+
+
 
 """
 a test class
@@ -16,7 +16,157 @@ REFERENCES:
 
 import numpy as np
 import math
+import collections
 from sympy import *
+
+# memo of power - hydrogen rate tables, keyed by the PEM parameters, maximum power and tolerance
+_rate_tables = {}
+
+"""
+
+a stateless polarization model of a PEM cell: functions of a read-only parameter set (pem_par)
+and of current or power arrays of any shape (e.g. time series, scenario x time), safe to call from threads
+
+"""
+# parameters of a PEM cell (see h2_module)
+pem_par = collections.namedtuple('pem_par',['theta_m','A','alpha_an','alpha_cat','i0_an','i0_cat',\
+        'T','P_h2','P_o2','P_h2o','lambda_h','n'])
+
+# reverse energy
+def pem_E0_rev(par):
+    E0_rev = 1.229 - 0.9e-3*(par.T+273.15-298)
+
+    return E0_rev
+
+# open circuit energy, from the reverse energy E0_rev
+def pem_E_oc(par,E0_rev=None):
+    # ideal gas constant
+    R = 8.31446261815324 #in J⋅K−1⋅mol−1
+    # Faraday constant
+    F = 96485.3329      #s A / mol or C mol^-1
+
+    if E0_rev is None:
+        E0_rev = pem_E0_rev(par)
+    t_log = R*(par.T+273.15)/(par.n*F) * np.log(par.P_h2*par.P_o2**(0.5)/par.P_h2o)
+
+    return E0_rev + t_log
+
+# Tafel coefficients of the activation over potential of the anode and the cathode
+def pem_C_act(par):
+    # ideal gas constant
+    R = 8.31446261815324 #in J⋅K−1⋅mol−1
+    # Faraday constant
+    F = 96485.3329      #s A / mol or C mol^-1
+
+    C_term = R*(par.T+273.15)/F
+
+    return C_term/(2*par.alpha_an), C_term/(2*par.alpha_cat)
+
+# the activation over potential at current I (in A)
+def pem_eta_act(par,I):
+    i = np.asarray(I,dtype=float)/par.A
+    C_an,C_cat = pem_C_act(par)
+
+    eta_an = C_an * np.log(i/par.i0_an)
+    eta_cat = C_cat * np.log(i/par.i0_cat)
+
+    return eta_an + eta_cat
+
+# the conductivity of the PEM
+def pem_sigma_m(par):
+    sigma_m = (0.005139*par.lambda_h - 0.00326)\
+            *math.exp(1268*(1.0/303.0 - 1.0/(par.T+273.15)))
+
+    return sigma_m
+
+# the ohmic overvoltage potential at current I (in A)
+def pem_eta_ohm(par,I,sigma_m=None):
+    if sigma_m is None:
+        sigma_m = pem_sigma_m(par)
+    j = np.asarray(I,dtype=float)/par.A
+
+    return (par.theta_m * 1e-3) * j/sigma_m
+
+# cell voltage at current I (in A)
+def pem_V(par,I,E_oc=None,sigma_m=None):
+    if E_oc is None:
+        E_oc = pem_E_oc(par)
+
+    return E_oc + pem_eta_act(par,I) + pem_eta_ohm(par,I,sigma_m)
+
+# derivative of the cell voltage with respect to current
+def pem_dV_dI(par,I,sigma_m=None):
+    if sigma_m is None:
+        sigma_m = pem_sigma_m(par)
+    C_an,C_cat = pem_C_act(par)
+
+    dV_act = (C_an + C_cat)/np.asarray(I,dtype=float)
+    dV_ohm = (par.theta_m * 1e-3)/(sigma_m*par.A)
+
+    return dV_act + dV_ohm
+
+# cell power (in W) at current I (in A)
+def pem_P(par,I):
+    I = np.asarray(I,dtype=float)
+
+    return I*pem_V(par,I)
+
+# cell current (in A) at power P (in W), zero for P <= 0
+#   Newton iteration on f(I) = I*V(I) - P for all elements at once, safeguarded by bisection on a bracket;
+#   f is convex with f(0+) = -P, the root is unique
+#   report=True also returns (number of iterations, maximum relative residual, converged)
+def pem_I(par,P,tol=1e-12,iter_max=100,report=False):
+    P = np.asarray(P,dtype=float)
+    E_oc = pem_E_oc(par)
+    sigma_m = pem_sigma_m(par)
+
+    I = np.zeros(P.shape)
+    active = P > 0.0
+    P_a = P[active]
+
+    # bracket: f < 0 at I_low, f > 0 at I_high
+    I_low = np.zeros(P_a.shape)
+    I_a = P_a/E_oc
+    f = I_a*pem_V(par,I_a,E_oc,sigma_m) - P_a
+    while np.any(f <= 0.0):
+        low = f <= 0.0
+        I_low = np.where(low,I_a,I_low)
+        I_a = np.where(low,2.0*I_a,I_a)
+        f = I_a*pem_V(par,I_a,E_oc,sigma_m) - P_a
+    I_high = I_a.copy()
+
+    i_iter = 0
+    todo = np.ones(P_a.shape,dtype=bool)
+    while i_iter < iter_max and todo.any():
+        i_iter = i_iter + 1
+
+        I_t = I_a[todo]
+        V = pem_V(par,I_t,E_oc,sigma_m)
+        df = V + I_t*pem_dV_dI(par,I_t,sigma_m)
+        I_new = I_t - f[todo]/df
+        # bisection if the Newton step leaves the bracket
+        lo = I_low[todo]
+        hi = I_high[todo]
+        outside = ~((lo < I_new) & (I_new < hi))
+        I_new = np.where(outside,0.5*(lo + hi),I_new)
+
+        f_new = I_new*pem_V(par,I_new,E_oc,sigma_m) - P_a[todo]
+        I_high[todo] = np.where(f_new > 0.0,I_new,hi)
+        I_low[todo] = np.where(f_new > 0.0,lo,I_new)
+
+        done = (np.abs(I_new - I_t) <= tol*I_new) | (np.abs(f_new) <= tol*P_a[todo])
+        I_a[todo] = I_new
+        f[todo] = f_new
+        idx = np.flatnonzero(todo)
+        todo[idx[done]] = False
+
+    I[active] = I_a
+
+    if report:
+        residual = np.max(np.abs(f)/P_a) if P_a.size > 0 else 0.0
+        return I, (i_iter,residual,not todo.any())
+
+    return I
 """
 
 a model to decribe hydrogen production
@@ -49,8 +199,33 @@ class h2_module:
         # a symbol for current 
         self.I_sbl = 0 
 
+        # power - hydrogen rate table (rate_table), None to solve the polarization curve at each call
+        self.table = None
+
+    # read-only parameter set of the stateless polarization model (pem_V, pem_I, ...)
+    def params(self):
+        return pem_par(self.theta_m,self.A,self.alpha_an,self.alpha_cat,self.i0_an,self.i0_cat,\
+                self.T,self.P_h2,self.P_o2,self.P_h2o,self.lambda_h,self.n)
+
+    # hydrogen production rate (mol/s) for an array of power (MW) of any shape, without changing the module
+    def cal_array(self,P):
+        P = np.asarray(P,dtype=float)
+        if self.table is not None:
+            P_grid,n_grid = self.table
+            if np.all((P >= 0.0) & (P <= P_grid[-1])):
+                return np.interp(P,P_grid,n_grid)
+
+        I = pem_I(h2_module.params(self),P*1e6,iter_max=self.iter_max)
+
+        return h2_module.h2_rate(I)
+
     # modelling hydrogen production
     def cal(self,P):
+        if self.table is not None:
+            P_grid,n_grid = self.table
+            if np.all((P >= 0.0) & (P <= P_grid[-1])):
+                return np.interp(P,P_grid,n_grid)  # in mol/s
+
         P = P*1e6      # convert MW to W
         I = h2_module.I_cal(self,P)
         n_rate = h2_module.h2_rate(I)
@@ -59,6 +234,11 @@ class h2_module:
 
     # modelling (all) hydrogen consumed to produce power
     def cal_consume_all(self,n_unit_consume_rate):
+        if self.table is not None:
+            P_grid,n_grid = self.table
+            if np.all((n_unit_consume_rate >= 0.0) & (n_unit_consume_rate <= n_grid[-1])):
+                return np.interp(n_unit_consume_rate,n_grid,P_grid)  # in MW
+
         I_consumption = h2_module.I_consumption_cal(n_unit_consume_rate)
         P = h2_module.P_cal(self,I_consumption)
 
@@ -66,6 +246,47 @@ class h2_module:
 
         return P
 
+    # tabulate the hydrogen rate (mol/s) against power (MW) over [0, P_max]
+    #   knots in current are refined by bisection until the linear interpolation of the rate against power,
+    #   and of power against the rate (cal_consume_all), is within the relative tolerance tol at the midpoints
+    #   tables are shared by all modules with the same parameters
+    def rate_table(self,P_max,tol=1e-6):
+        key = (self.theta_m,self.A,self.alpha_an,self.alpha_cat,self.i0_an,self.i0_cat,\
+                self.T,self.P_h2,self.P_o2,self.P_h2o,self.lambda_h,float(P_max),float(tol))
+
+        if key not in _rate_tables:
+            par = h2_module.params(self)
+            I_max = h2_module.I_cal(self,P_max*1e6)
+            # dense towards zero current, where the activation terms are logarithmic
+            I_knot = I_max*np.geomspace(1e-9,1.0,64)
+            P_knot = pem_P(par,I_knot)
+
+            for i_round in range(64):
+                I_mid = 0.5*(I_knot[:-1] + I_knot[1:])
+                P_mid = pem_P(par,I_mid)
+
+                err_n = np.abs(np.interp(P_mid,P_knot,I_knot) - I_mid) > tol*I_mid
+                err_P = np.abs(np.interp(I_mid,I_knot,P_knot) - P_mid) > tol*P_mid
+                split = err_n | err_P
+                if not split.any():
+                    break
+
+                I_knot = np.concatenate((I_knot,I_mid[split]))
+                P_knot = np.concatenate((P_knot,P_mid[split]))
+                order = np.argsort(I_knot)
+                I_knot = I_knot[order]
+                P_knot = P_knot[order]
+
+            P_grid = np.concatenate(([0.0],P_knot/1e6))       # in MW
+            n_grid = np.concatenate(([0.0],h2_module.h2_rate(I_knot)))   # in mol/s
+            P_grid[-1] = P_max
+            P_grid.setflags(write=False)
+            n_grid.setflags(write=False)
+
+            _rate_tables[key] = (P_grid,n_grid)
+
+        return _rate_tables[key]
+
     # calculate the power produced under current current
     def P_cal(self,I_consumption):
         # ideal gas constant
@@ -75,15 +296,13 @@ class h2_module:
         
         self.I_sbl = I_consumption
 
-        E0_rev = h2_module._E0_rev_(self)
-        E_oc = h2_module._E_oc_(self,E0_rev)
-
-        eta_act = h2_module._eta_act_(self)
-
-        sigma_m = h2_module._sigma_m_(self)
-        eta_ohm = h2_module._eta_ohm_(self,sigma_m)
-
-        V_oc = h2_module.V_oc(E_oc,eta_act,eta_ohm)
+        par = h2_module.params(self)
+        if np.ndim(I_consumption) == 0 and I_consumption > 0.0:
+            E_oc = float(pem_E_oc(par))
+            sigma_m = pem_sigma_m(par)
+            V_oc,dV_dI = h2_module._V_float_(par,float(I_consumption),E_oc,sigma_m,pem_C_act(par))
+        else:
+            V_oc = pem_V(par,I_consumption)
 
         P = I_consumption * V_oc
 
@@ -107,56 +326,84 @@ class h2_module:
 
         print ('total voltage',V_oc)
 
-    # calculate the current under power    
-    def I_cal(self,P):
-        # ideal gas constant
-        R = 8.31446261815324 #in J⋅K−1⋅mol−1
-        # Faraday constant
-        F = 96485.3329      #s A / mol or C mol^-1
-        E0_rev = h2_module._E0_rev_(self)
-        E_oc = h2_module._E_oc_(self,E0_rev)
-#        print (E_oc)
-#        P = 15
-        v_ini = E_oc
-        I_ini = P/v_ini
-        self.I_sbl = I_ini
+    # calculate the current under power
+    #   Newton iteration on f(I) = I*V(I) - P, safeguarded by bisection on a bracket [I_low, I_high]
+    #   f is convex with f(0+) = -P, so the root is unique and Newton converges from above in a few steps
+    #   report=True also returns (number of iterations, relative residual, converged)
+    def I_cal(self,P,report=False):
+        if P <= 0.0:
+            if report:
+                return 0.0, (0,0.0,True)
+            return 0.0
+
+        # parameters and current independent terms, once per call
+        par = h2_module.params(self)
+        E_oc = float(pem_E_oc(par))
+        sigma_m = pem_sigma_m(par)
+        C_act = pem_C_act(par)
+
+        # bracket: f < 0 at I_low, f > 0 at I_high
+        I_low = 0.0
+        I = P/E_oc
+        f,df = h2_module._P_residual_(par,I,P,E_oc,sigma_m,C_act)
+        while f <= 0.0:
+            I_low = I
+            I = 2.0*I
+            f,df = h2_module._P_residual_(par,I,P,E_oc,sigma_m,C_act)
+        I_high = I
 
-        v_last = v_ini
-        
         i_iter = 0
-
-        # calculate pem current
-        while i_iter <= self.iter_max:
+        converged = False
+        while i_iter < self.iter_max:
             i_iter = i_iter + 1
-            eta_act = h2_module._eta_act_(self)
-#            print(eta_act)
-
-            sigma_m = h2_module._sigma_m_(self)
-            eta_ohm = h2_module._eta_ohm_(self,sigma_m)
-
-            V_oc = h2_module.V_oc(E_oc,eta_act,eta_ohm)
 
-#            print ('total voltage',V_oc)
-
-            det_V = abs(V_oc - v_last)
-#            print ('error is: ', det_V)
-
-            v_last = V_oc
-
-            if det_V < 1e-4:
-                I = P/V_oc
+            I_new = I - f/df
+            # bisection if the Newton step leaves the bracket
+            if not (I_low < I_new < I_high):
+                I_new = 0.5*(I_low + I_high)
+
+            det_I = abs(I_new - I)
+            I = I_new
+            f,df = h2_module._P_residual_(par,I,P,E_oc,sigma_m,C_act)
+            if f > 0.0:
+                I_high = I
+            else:
+                I_low = I
+
+            if det_I <= 1e-12*I or abs(f) <= 1e-12*P:
+                converged = True
                 break
 
-            I_curr = P/V_oc
-            self.I_sbl = I_curr
-        
-        if i_iter > self.iter_max:
+        if not converged:
             print ('***************** WARNING !!*****************')
             print ('the pem current calculation does not converge')
             print ('*********************************************')
 
+        if report:
+            return I, (i_iter,abs(f)/P,converged)
+
         return I
 
+    # power residual f(I) = I*V(I) - P and its derivative df/dI = V + I*dV/dI
+    def _P_residual_(par,I,P,E_oc,sigma_m,C_act):
+        V,dV_dI = h2_module._V_float_(par,I,E_oc,sigma_m,C_act)
+
+        f = I*V - P
+        df = V + I*dV_dI
+
+        return f, df
+
+    # cell voltage and its derivative (pem_V, pem_dV_dI) in float arithmetic for a scalar current I > 0,
+    # from the current independent terms E_oc, sigma_m and C_act (pem_C_act)
+    def _V_float_(par,I,E_oc,sigma_m,C_act):
+        C_an,C_cat = C_act
+        i = I/par.A
+
+        V = E_oc + (C_an*float(np.log(i/par.i0_an)) + C_cat*float(np.log(i/par.i0_cat))) + (par.theta_m * 1e-3) * i/sigma_m
+        dV_dI = (C_an + C_cat)/I + (par.theta_m * 1e-3)/(sigma_m*par.A)
+
+        return V, dV_dI
+
 #        a validation of eta and i density
 #
 #        i_an = self.i0_an*math.exp(alpha_an*F/(R*(self.T+273.15))*eta_an)
@@ -185,60 +432,23 @@ class h2_module:
 
     # reverse energy 
     def _E0_rev_(self):
-        E0_rev = 1.229 - 0.9e-3*(self.T+273.15-298)
-
-        return E0_rev
+        return pem_E0_rev(h2_module.params(self))
     
     # open circuit energy
     def _E_oc_(self,E0_rev):
-        # ideal gas constant
-        R = 8.31446261815324 #in J⋅K−1⋅mol−1
-        # Faraday constant
-        F = 96485.3329      #s A / mol or C mol^-1
-
-        # log term 
-        t_log = R*(self.T+273.15)/(self.n*F) * np.log(self.P_h2*self.P_o2**(0.5)/self.P_h2o)
+        return pem_E_oc(h2_module.params(self),E0_rev)
 
-        E_oc = E0_rev + t_log
-
-        return E_oc
-
-    # the activation over potential
+    # the activation over potential at the current I_sbl
     def _eta_act_(self):
-        # ideal gas constant
-        R = 8.31446261815324 #in J⋅K−1⋅mol−1
-        # Faraday constant
-        F = 96485.3329      #s A / mol or C mol^-1
-
-        # calculate the current density 
-        i = self.I_sbl/self.A
-
-     #   print ('current density', i)
-        
-        C_term = R*(self.T+273.15)/F
+        return pem_eta_act(h2_module.params(self),self.I_sbl)
 
-        #eta_an = C_term/self.alpha_an * math.asinh(i/(2*self.i0_an))
-        #eta_cat = C_term/self.alpha_cat * math.asinh(i/(2*self.i0_cat))
-        eta_an = C_term/(2*self.alpha_an) * np.log(i/self.i0_an)
-        eta_cat = C_term/(2*self.alpha_cat) * np.log(i/self.i0_cat)
-
-        eta_act = eta_an + eta_cat
-
-        return eta_act#, eta_an, eta_cat
-
-    # the ohmic overvoltage potential
+    # the ohmic overvoltage potential at the current I_sbl
     def _eta_ohm_(self,sigma_m):
-        j = self.I_sbl/self.A
-        eta_ohm =(self.theta_m * 1e-3) * j/sigma_m
-
-        return eta_ohm
+        return pem_eta_ohm(h2_module.params(self),self.I_sbl,sigma_m)
 
     # the conductivity of the PEM
     def _sigma_m_(self):
-        sigma_m = (0.005139*self.lambda_h - 0.00326)\
-                *math.exp(1268*(1.0/303.0 - 1.0/(self.T+273.15)))
-
-        return sigma_m
+        return pem_sigma_m(h2_module.params(self))
         
     # calculate the open circuit voltage 
     def V_oc(E_oc,eta_act,eta_ohm):
@@ -520,9 +730,12 @@ a model for the hydrogen system
 class h2_system(h2_module,h2_cluster,h2_storage):
     def __init__(self,theta_m,A,alpha_an,alpha_cat,i0_an,i0_cat,T,P_h2,P_o2,P_h2o,iter_max,\
                     n_unit,Pmax_unit,Pmin_unit,\
-                    m_store):
+                    m_store,use_table=False):
         h2_module.__init__(self,theta_m,A,alpha_an,alpha_cat,i0_an,i0_cat,T,P_h2,P_o2,P_h2o,iter_max)
         h2_cluster.__init__(self,n_unit,Pmax_unit,Pmin_unit)
+        # interpolate the polarization curve from a table shared by all systems of the run
+        if use_table:
+            self.table = h2_module.rate_table(self,Pmax_unit)
         # convert the initial storage from kg to mol
         m_f = 2e-3             # in kg/mol
         n_store = m_store/ m_f
@@ -530,9 +743,13 @@ class h2_system(h2_module,h2_cluster,h2_storage):
         h2_storage.__init__(self,n_store)
 
         self.m_stored_data = [m_store]   # array of total stored hydrogen, in kg
+        self.dt_last = None     # last time step of the previous call, in s
 
     # calculate the power and hydrogen change 
-    def cal(self,P_input,time):
+    # for data streamed in windows, t_next is the first time (in min) of the next window, the last step of
+    # the window lasts until t_next; without t_next the last step repeats the step before it, or the last
+    # step of the previous call for a window of a single sample
+    def cal(self,P_input,time,t_next=None):
         P_pro = []
         P_con = []
         P_res = []
@@ -543,12 +760,24 @@ class h2_system(h2_module,h2_cluster,h2_storage):
         time = list(time)
 #        print ('convert time',time)
 
+        if t_next is not None:
+            dt_last = t_next*60 - time[-1]
+        elif len(time) > 1:
+            dt_last = time[-1] - time[-2]
+        elif self.dt_last is not None:
+            dt_last = self.dt_last
+        else:
+            raise ValueError('time step of a single sample unknown: give t_next (first time of the next window)')
+        self.dt_last = dt_last
+
         for i in range(len(P_input)):
         #    print ('\n')
         #    print ('a new time step')
             
             if i != (len(time)-1):
                 dt = time[i+1] - time[i]
+            else:
+                dt = dt_last
 
             P_curr = P_input[i]
             # power production, consumption, and residual in current time step
@@ -667,6 +896,10 @@ class h2_system(h2_module,h2_cluster,h2_storage):
     def h2_stored(self):
         m_store = h2_system.aquire_m(self)
         self.m_stored_data.append(m_store)
+
+    # clear history of hydrogen mass storage data, keep the current storage (for data streamed in windows)
+    def clear_m_records(self):
+        self.m_stored_data = [self.m_stored_data[-1]]
         
 
     # sysem minimum production power demand
@@ -32,6 +32,12 @@ class dataReader:
         self.dataMode = 0
         self.inFile_Array = []
         self.multiplier = 1.0   # set default value
+        self.cacheDir = None    # set default value, no cache of grid data
+        self.time_step = 0.0    # set default value, no resampling of grid data
+        self.resample_mode = 'mean' # set default value
+        self.syn_scenarios = 1  # set default value, number of synthetic demand data sets (dataMode 1)
+        self.syn_days = 7.0     # set default value, length of synthetic demand in days
+        self.syn_step = 5.0     # set default value, time step of synthetic demand in min
 
         # system config variables
         self.components = []
@@ -47,6 +53,7 @@ class dataReader:
         self.time_interval = 0.0
         self.auto_con = 1       # set default value
         self.len_time = 0
+        self.rng_seed = None    # set default value, random streams seeded once per run
 
         # marco econamic data 
         self.dollar_year = 2018     # set defalt value
@@ -59,9 +66,19 @@ class dataReader:
         self.h2_base = 0.0
 
         # wind data 
+        self.wind_source = 0    # set default value, 0 for Rayleigh distribution, 1 for wind column of grid data, 2 for wind_file
+        self.wind_capacity = 0.0    # set default value, installed capacity in MW of the wind column of grid data
+        self.wind_file = ''     # measured wind data (time in min, wind velocity in m/s)
+        self.wind_t0 = ''       # set default value, date of time zero of wind_file, the first date of each data set if empty
+        self.wind_t_scale = 1.0 # set default value, minutes per time unit of wind_file
         self.v_max = 0.0
         self.v_mean = 0.0
         self.n_range = 0
+        self.air_file = ''          # set default value, measured air data (time in min, T in degC, p in Pa), constant density if empty
+        self.shear_h_ref = 0.0      # set default value, measurement height of wind velocity in m, no wind shear if 0
+        self.shear_law = 'power'    # set default value, 'power' or 'log'
+        self.shear_alpha = 1./7.    # set default value, exponent of the power law
+        self.shear_z0 = 0.03        # set default value, roughness length of the log law in m
 
         # wind turbine tech data
         self.d_wing = 0.0
@@ -71,6 +88,10 @@ class dataReader:
         self.cut_in = 0.0
         self.cut_out = 0.0
 
+        self.curve_file = ''        # set default value, manufacturer cp or power curve (csv), IEC curve A if empty
+        self.curve_type = 'cp'      # set default value, 'cp' or 'power' (in kW)
+        self.turbine_dynamic = 0    # set default value, 1 for the rotor inertia (J_turbine) model
+
         self.loc_type = 1   # set default value
 
         # wind turbine eco data
@@ -81,6 +102,13 @@ class dataReader:
 
         # Nuclear Power Plant tech data
         self.LF_lim = 0.0
+        self.LF_mode = 0        # set default value, 0 for base load, 1 for load following
+        self.LF_min = 0.5       # set default value, minimum stable load, fraction of the rated power
+        self.nu_refuel_cycle = 0.0  # set default value, days between refuelling outages of a module, 0 for none
+        self.nu_refuel_days = 0.0   # set default value, length of a refuelling outage in days
+        self.nu_refuel_start = ''   # set default value, start date of the refuelling calendar, the first data set if empty
+        self.nu_FOR = 0.0           # set default value, forced outage rate of a module
+        self.nu_MTTR = 72.0         # set default value, mean time to repair in hours
 
         # Nuclear Power Plant eco data
         self.FOAK = 1       # set default value
@@ -117,6 +145,7 @@ class dataReader:
         self.i0_cat = 0.0
 
         self.iter_max = 5000    # set default value
+        self.pem_table = 0      # set default value, 1 to interpolate the polarization curve from a shared table
 
         self.Pmin_unit = 0.0
 
@@ -232,6 +261,58 @@ class dataReader:
                 print ('ERROR: Please define multiplier!\n')
                 sys.exit()
 
+            if any('cacheDir' in line for line in inData):
+                for line in inData:
+                    if 'cacheDir' in line:
+                        cacheDir = str(line.split('=')[-1].lstrip().rstrip())
+                        self.cacheDir = cacheDir
+
+            if any('time_step' in line for line in inData):
+                for line in inData:
+                    if 'time_step' in line:
+                        time_step = float(line.split('=')[-1].lstrip().rstrip())
+                        self.time_step = time_step
+
+            if any('resample_mode' in line for line in inData):
+                for line in inData:
+                    if 'resample_mode' in line:
+                        resample_mode = str(line.split('=')[-1].lstrip().rstrip())
+                        self.resample_mode = resample_mode
+
+        elif dataMode == 1:
+            # synthetic demand: multiplier is the annual mean demand in MW
+            if any('multiplier' in line for line in inData):
+                for line in inData:
+                    if 'multiplier' in line:
+                        multiplier = float(line.split('=')[-1].lstrip().rstrip())
+                        self.multiplier = multiplier
+            else:
+                f.write ('ERROR: Please define multiplier (annual mean demand in MW)!\n')
+                f.write('\n')
+                print ('ERROR: Please define multiplier (annual mean demand in MW)!\n')
+                sys.exit()
+
+            if any('syn_scenarios' in line for line in inData):
+                for line in inData:
+                    if 'syn_scenarios' in line:
+                        syn_scenarios = int(line.split('=')[-1].lstrip().rstrip())
+                        self.syn_scenarios = syn_scenarios
+
+            if any('syn_days' in line for line in inData):
+                for line in inData:
+                    if 'syn_days' in line:
+                        syn_days = float(line.split('=')[-1].lstrip().rstrip())
+                        self.syn_days = syn_days
+
+            if any('syn_step' in line for line in inData):
+                for line in inData:
+                    if 'syn_step' in line:
+                        syn_step = float(line.split('=')[-1].lstrip().rstrip())
+                        self.syn_step = syn_step
+
+            # one data set for each synthetic scenario
+            self.inFile_Array = ['synthetic_'+str(i) for i in range(self.syn_scenarios)]
+
         f.close()
 
     def _system_data_(self,inData):
@@ -380,6 +461,12 @@ class dataReader:
             print ('WARNING: time length not defined!\n')
             print ('MESSAGE: use full length of input file!\n')
 
+        if any('rng_seed' in line for line in inData):
+            for line in inData:
+                if 'rng_seed' in line:
+                    rng_seed = int(line.split('=')[-1].lstrip().rstrip())
+                    self.rng_seed = rng_seed
+
         f.close()
 
     def _eco_base_(self,inData):
@@ -458,6 +545,48 @@ class dataReader:
 
         f = open(self.log,'a')
 
+        if any('wind_source' in line for line in inData):
+            for line in inData:
+                if 'wind_source' in line:
+                    wind_source = int(line.split('=')[-1].lstrip().rstrip())
+                    self.wind_source = wind_source
+
+        if self.wind_source == 1:
+            if any('wind_capacity' in line for line in inData):
+                for line in inData:
+                    if 'wind_capacity' in line:
+                        wind_capacity = float(line.split('=')[-1].lstrip().rstrip())
+                        self.wind_capacity = wind_capacity
+            else:
+                f.write ('ERROR: Please define wind_capacity (installed capacity of the wind column in MW)!\n')
+                f.write('\n')
+                print ('ERROR: Please define wind_capacity (installed capacity of the wind column in MW)!\n')
+                sys.exit()
+
+        if self.wind_source == 2:
+            if any('wind_file' in line for line in inData):
+                for line in inData:
+                    if 'wind_file' in line:
+                        wind_file = str(line.split('=')[-1].lstrip().rstrip())
+                        self.wind_file = wind_file
+            else:
+                f.write ('ERROR: Please define wind_file!\n')
+                f.write('\n')
+                print ('ERROR: Please define wind_file!\n')
+                sys.exit()
+
+            if any('wind_t0' in line for line in inData):
+                for line in inData:
+                    if 'wind_t0' in line:
+                        wind_t0 = str(line.split('=')[-1].lstrip().rstrip())
+                        self.wind_t0 = wind_t0
+
+            if any('wind_t_scale' in line for line in inData):
+                for line in inData:
+                    if 'wind_t_scale' in line:
+                        wind_t_scale = float(line.split('=')[-1].lstrip().rstrip())
+                        self.wind_t_scale = wind_t_scale
+
         if any('v_max' in line for line in inData):
             for line in inData:
                 if 'v_max' in line:
@@ -488,6 +617,36 @@ class dataReader:
             f.write('\n')
             print ('WARNING: n_range not defined!\n')
 
+        if any('air_file' in line for line in inData):
+            for line in inData:
+                if 'air_file' in line:
+                    air_file = str(line.split('=')[-1].lstrip().rstrip())
+                    self.air_file = air_file
+
+        if any('shear_h_ref' in line for line in inData):
+            for line in inData:
+                if 'shear_h_ref' in line:
+                    shear_h_ref = float(line.split('=')[-1].lstrip().rstrip())
+                    self.shear_h_ref = shear_h_ref
+
+        if any('shear_law' in line for line in inData):
+            for line in inData:
+                if 'shear_law' in line:
+                    shear_law = str(line.split('=')[-1].lstrip().rstrip())
+                    self.shear_law = shear_law
+
+        if any('shear_alpha' in line for line in inData):
+            for line in inData:
+                if 'shear_alpha' in line:
+                    shear_alpha = float(line.split('=')[-1].lstrip().rstrip())
+                    self.shear_alpha = shear_alpha
+
+        if any('shear_z0' in line for line in inData):
+            for line in inData:
+                if 'shear_z0' in line:
+                    shear_z0 = float(line.split('=')[-1].lstrip().rstrip())
+                    self.shear_z0 = shear_z0
+
         f.close()
 
     def _wind_turbine_data_(self,inData):
@@ -544,6 +703,24 @@ class dataReader:
             f.write('\n')
             print ('WARNING: cut_out not defined!\n')
 
+        if any('curve_file' in line for line in inData):
+            for line in inData:
+                if 'curve_file' in line:
+                    curve_file = str(line.split('=')[-1].lstrip().rstrip())
+                    self.curve_file = curve_file
+
+        if any('curve_type' in line for line in inData):
+            for line in inData:
+                if 'curve_type' in line:
+                    curve_type = str(line.split('=')[-1].lstrip().rstrip())
+                    self.curve_type = curve_type
+
+        if any('turbine_dynamic' in line for line in inData):
+            for line in inData:
+                if 'turbine_dynamic' in line:
+                    turbine_dynamic = int(line.split('=')[-1].lstrip().rstrip())
+                    self.turbine_dynamic = turbine_dynamic
+
         f.close()
 
     def _wind_eco_data_(self,inData):
@@ -607,6 +784,54 @@ class dataReader:
             f.write('\n')
             print ('WARNING: LF_lim not defined!\n')
 
+        if any('LF_mode' in line for line in inData):
+            for line in inData:
+                if 'LF_mode' in line:
+                    LF_mode = int(line.split('=')[-1].lstrip().rstrip())
+                    self.LF_mode = LF_mode
+
+        if self.LF_mode == 1 and self.LF_lim <= 0.0:
+            f.write ('ERROR: Please define LF_lim (positive) for load following!\n')
+            f.write('\n')
+            print ('ERROR: Please define LF_lim (positive) for load following!\n')
+            sys.exit()
+
+        if any('LF_min' in line for line in inData):
+            for line in inData:
+                if 'LF_min' in line:
+                    LF_min = float(line.split('=')[-1].lstrip().rstrip())
+                    self.LF_min = LF_min
+
+        if any('nu_refuel_cycle' in line for line in inData):
+            for line in inData:
+                if 'nu_refuel_cycle' in line:
+                    nu_refuel_cycle = float(line.split('=')[-1].lstrip().rstrip())
+                    self.nu_refuel_cycle = nu_refuel_cycle
+
+        if any('nu_refuel_days' in line for line in inData):
+            for line in inData:
+                if 'nu_refuel_days' in line:
+                    nu_refuel_days = float(line.split('=')[-1].lstrip().rstrip())
+                    self.nu_refuel_days = nu_refuel_days
+
+        if any('nu_refuel_start' in line for line in inData):
+            for line in inData:
+                if 'nu_refuel_start' in line:
+                    nu_refuel_start = str(line.split('=')[-1].lstrip().rstrip())
+                    self.nu_refuel_start = nu_refuel_start
+
+        if any('nu_FOR' in line for line in inData):
+            for line in inData:
+                if 'nu_FOR' in line:
+                    nu_FOR = float(line.split('=')[-1].lstrip().rstrip())
+                    self.nu_FOR = nu_FOR
+
+        if any('nu_MTTR' in line for line in inData):
+            for line in inData:
+                if 'nu_MTTR' in line:
+                    nu_MTTR = float(line.split('=')[-1].lstrip().rstrip())
+                    self.nu_MTTR = nu_MTTR
+
     def _npp_eco_data_(self,inData):
 
         f = open(self.log,'a')
@@ -875,6 +1100,12 @@ class dataReader:
             f.write('\n')
             print ('WARNING: iter_max not defined!\n')
             print ('MESSAGE: default set iter_max = 5000!\n')
+
+        if any('pem_table' in line for line in inData):
+            for line in inData:
+                if 'pem_table' in line:
+                    pem_table = int(line.split('=')[-1].lstrip().rstrip())
+                    self.pem_table = pem_table
         f.close()
 
     def _PEM_eco_data_(self,inData):
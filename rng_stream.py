@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# File              : rng_stream.py
+# Author            : tzhang
+# Date              : 18.10.2026
+# Last Modified Date: 18.10.2026
+# Last Modified By  : tzhang
+
+import zlib
+import numpy as np
+
+"""
+
+a module to provide explicit, seedable random streams for stochastic components (wind, synthetic grid demand, ...)
+    - a stream is identified by a name and optional integer keys (e.g. index of the data set)
+    - asking for the same stream twice gives the same random numbers (common random numbers),
+      so all cases and configurations are evaluated on identical weather
+    - spawn() gives independent, reproducible sub-streams for parallel workers
+
+"""
+class rng_stream:
+    def __init__(self,seed=None,spawn_key=()):
+        # entropy is drawn once if no seed is given, so streams are still common within a run
+        self.seed_seq = np.random.SeedSequence(seed,spawn_key=tuple(spawn_key))
+
+        self.seed = self.seed_seq.entropy
+        self.spawn_key = self.seed_seq.spawn_key
+
+    # random generator of a named stream
+    def stream(self,name,*keys):
+        name_key = zlib.crc32(str(name).encode())
+        seed_seq = np.random.SeedSequence(self.seed,spawn_key=self.spawn_key+(name_key,)+tuple(keys))
+
+        return np.random.default_rng(seed_seq)
+
+    # independent sub-streams, e.g. one for each parallel worker
+    def spawn(self,n_stream):
+        streams = []
+        for i in range(n_stream):
+            streams.append(rng_stream(self.seed,self.spawn_key+(2**32+i,)))
+
+        return streams
+
+
+# stationary AR(1) process x[k] = phi*x[k-1] + sqrt(1-phi**2)*eps[k] with unit variance,
+# from standard normal samples eps along the last axis (scale it for other variances)
+# the recursion is evaluated in blocks of n_block steps as matrix products
+def ar1_process(eps,phi,n_block=64):
+    n_time = eps.shape[-1]
+    eps = eps * np.sqrt(1.0-phi**2)
+    eps[...,0] = eps[...,0]/np.sqrt(1.0-phi**2)
+
+    # inside a block, x[k] = phi**(k+1)*x[-1] + sum_j phi**(k-j)*eps[j]
+    k = np.arange(n_block)
+    lag = k[:,np.newaxis] - k[np.newaxis,:]
+    L = np.where(lag >= 0, phi**np.maximum(lag,0), 0.0)
+    p_carry = phi**(k+1)
+
+    x = np.empty(eps.shape)
+    x_last = np.zeros(eps.shape[:-1])
+    for i in range(0,n_time,n_block):
+        n = min(n_block,n_time-i)
+        x[...,i:i+n] = eps[...,i:i+n] @ L[:n,:n].T + x_last[...,np.newaxis]*p_carry[:n]
+        x_last = x[...,i+n-1]
+
+    return x
+
+
+"""
+a class test
+
+streams = rng_stream(2020)
+
+# identical wind for two cases of the same data set
+v1 = streams.stream('wind',0).random(5)
+v2 = streams.stream('wind',0).random(5)
+print (v1 == v2)
+
+# independent sub-streams for 4 workers
+workers = streams.spawn(4)
+print (workers[1].stream('wind',0).random(5))
+"""
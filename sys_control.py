@@ -6,6 +6,7 @@
 # Last Modified Date: 12.10.2020
 # Last Modified By  : tzhang
 
+import itertools
 import numpy as np
 
 """
@@ -425,8 +426,10 @@ class balancing:
         return ratio_ave
 
     # calculate total energy send to grid
-    def cal_e_acc_grid(self,P_to_grid,time):
-        e_acc_to_grid = [0.0]
+    # for data streamed in windows, e_ini is the accumulated energy of the previous window,
+    # and t_ini, P_ini are its last time and power to account for the interval between windows
+    def cal_e_acc_grid(self,P_to_grid,time,e_ini=0.0,t_ini=None,P_ini=None):
+        e_acc_to_grid = [e_ini + balancing._e_boundary_(time,t_ini,P_ini)]
 
         for i in range(1,len(time)):
             e_grid = P_to_grid[i-1] * (time[i]-time[i-1]) * 60 # power produced in the period, MWs
@@ -438,10 +441,13 @@ class balancing:
         return e_acc_to_grid
 
     # calculate total energy send to pem system
-    def cal_e_acc_h2sys(self,P_to_h2sys,time):
-        e_acc_to_h2sys = [0.0]
-        e_acc_from_h2sys = [0.0]
-        e_acc_net_h2sys = [0.0]
+    # e_ini is the (to, from, net) accumulated energy of the previous window when data is streamed
+    def cal_e_acc_h2sys(self,P_to_h2sys,time,e_ini=(0.0,0.0,0.0),t_ini=None,P_ini=None):
+        e_h2 = balancing._e_boundary_(time,t_ini,P_ini)
+
+        e_acc_to_h2sys = [e_ini[0] + max(e_h2,0.0)]
+        e_acc_from_h2sys = [e_ini[1] + min(e_h2,0.0)]
+        e_acc_net_h2sys = [e_ini[2] + e_h2]
 
         for i in range(1,len(time)):
             e_h2 = P_to_h2sys[i-1] * (time[i]-time[i-1]) * 60  # please note the unit of time is min here
@@ -465,9 +471,11 @@ class balancing:
 
 
     # calculate total energy abondoned, in MWh
-    def cal_e_abandon(self,P_res,time): 
-        e_abandon = [0.0]
-        e_acc_abandon = [0.0]
+    def cal_e_abandon(self,P_res,time,e_ini=0.0,t_ini=None,P_ini=None): 
+        e_ab = balancing._e_boundary_(time,t_ini,P_ini)
+
+        e_abandon = [e_ab]
+        e_acc_abandon = [e_ini + e_ab]
         for i in range(1,len(time)):
             e_ab = P_res[i-1] * (time[i]-time[i-1])  # please note the unit of time is min here
             e_ab = e_ab/60.0    # convert MWmin to MWh
@@ -478,3 +486,70 @@ class balancing:
 
         return e_abandon, e_acc_abandon
 
+    # balance demand windows of (time, demand), e.g. grid.stream, without holding the whole period
+    #   P_source(time) gives the power of the coupled nuclear-renewable system for the time of a window,
+    #   h2_sys is an h2_system (or None without hydrogen system), its storage carries over the windows
+    #   a window is balanced once the next one is read, so that its last step lasts until the next window;
+    #   the energy accumulators carry over with e_ini, t_ini and P_ini
+    #   returns the accumulated energy to grid, to, from and net h2 system and abandoned (in MWh),
+    #   and the ratio fit to the demand
+    def cal_stream(self,windows,P_source,h2_sys=None):
+        e_grid = 0.0
+        e_h2 = (0.0,0.0,0.0)
+        e_ab = 0.0
+        t_last = None
+        P_grid_last = None
+        P_h2_last = None
+        P_ab_last = None
+
+        ratio_sum = 0.0
+        n_sample = 0
+
+        pending = None
+        for window in itertools.chain(windows,[None]):
+            if pending is not None:
+                time,P_demand = pending
+                t_next = None if window is None else window[0][0]
+
+                P_coupled = np.broadcast_to(np.asarray(P_source(time),dtype=float),np.shape(time))
+
+                if h2_sys is None:
+                    P_h2_produced = [0.0] * len(time)
+                    P_h2_consumed = [0.0] * len(time)
+                    P_abandon = list(np.maximum(P_coupled - P_demand,0.0))
+                else:
+                    P_to_h2sys_virtual = balancing.cal_to_h2sys_virtual(self,P_coupled,P_demand,h2_sys.Pmin_system())
+                    P_h2_produced,P_h2_consumed,P_abandon = h2_sys.cal(P_to_h2sys_virtual,time,t_next)
+                    # only the current storage is kept
+                    h2_sys.clear_m_records()
+
+                P_to_h2sys = balancing.cal_to_h2sys(self,P_h2_produced,P_h2_consumed,P_abandon)
+                P_to_grid = balancing.cal_to_grid(self,P_demand,P_coupled,P_h2_produced,P_h2_consumed)
+
+                e_grid = balancing.cal_e_acc_grid(self,P_to_grid,time,e_grid,t_last,P_grid_last)[-1]
+                e_acc_h2 = balancing.cal_e_acc_h2sys(self,P_to_h2sys,time,e_h2,t_last,P_h2_last)
+                e_h2 = (e_acc_h2[0][-1],e_acc_h2[1][-1],e_acc_h2[2][-1])
+                e_ab = balancing.cal_e_abandon(self,P_abandon,time,e_ab,t_last,P_ab_last)[1][-1]
+
+                ratio_sum = ratio_sum + balancing.ratio_fit(self,P_demand,P_to_grid)*len(time)
+                n_sample = n_sample + len(time)
+
+                t_last = time[-1]
+                P_grid_last = P_to_grid[-1]
+                P_h2_last = P_to_h2sys[-1]
+                P_ab_last = P_abandon[-1]
+
+            pending = window
+
+        ratio_gridfit = ratio_sum/n_sample if n_sample > 0 else 0.0
+
+        return e_grid, e_h2[0], e_h2[1], e_h2[2], e_ab, ratio_gridfit
+
+    # energy between the last point of the previous window and the first point of current window, in MWh
+    def _e_boundary_(time,t_ini,P_ini):
+        if t_ini is None:
+            e_bound = 0.0
+        else:
+            e_bound = P_ini * (time[0]-t_ini)/60.0  # please note the unit of time is min here
+
+        return e_bound
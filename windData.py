@@ -7,16 +7,95 @@
 # Last Modified By  : tzhang
 
 # module to read or generate Rayleigh Distribution winddata
-import math
-import random
+import itertools
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.special import ndtr
+
+from rng_stream import ar1_process
+from file_cache import source_key, load_cache, save_cache
 
 class wind_Data:
     def __init__(self):
         self.time = []
         self.wind = []
 
+    # time and wind velocity sorted by time, the time converted to the target time unit as time*t_scale + t_offset
+    # (e.g. t_scale 60 for a file in hours, t_offset the minutes from the grid origin to the time zero of the file)
+    # non finite or duplicate times raise ValueError
+    def sorted_data(self,t_offset=0.0,t_scale=1.0):
+        t_wind = np.asarray(self.time,dtype=float)*t_scale + t_offset
+        v_wind = np.asarray(self.wind,dtype=float)
+
+        if len(t_wind) == 0 or not np.all(np.isfinite(t_wind)):
+            raise ValueError('wind data without valid times')
+        if np.any(np.diff(t_wind) < 0.0):
+            order = np.argsort(t_wind,kind='stable')
+            t_wind = t_wind[order]
+            v_wind = v_wind[order]
+        if np.any(np.diff(t_wind) == 0.0):
+            raise ValueError('duplicate times in wind data')
+
+        return t_wind, v_wind
+
+    # map the wind velocity onto another sorted time array (e.g. the time of grid demand)
+    #   mode 'interp': linear interpolation, 'asof': the last value at or before each time
+    #   the time of wind data is converted to the target time unit as time*t_scale + t_offset
+    #   target times outside the wind data take the first or last wind value, no overlap raises ValueError
+    def align(self,time,mode='interp',t_offset=0.0,t_scale=1.0):
+        time = np.asarray(time,dtype=float)
+        t_wind,v_wind = wind_Data.sorted_data(self,t_offset,t_scale)
+        if time[-1] < t_wind[0] or time[0] > t_wind[-1]:
+            raise ValueError('wind data do not overlap the time array, check the time offset and scale')
+
+        if mode == 'interp':
+            v_align = np.interp(time,t_wind,v_wind)
+        elif mode == 'asof':
+            idx = np.searchsorted(t_wind,time,side='right') - 1
+            v_align = v_wind[np.clip(idx,0,len(v_wind)-1)]
+        else:
+            raise ValueError('unknown align mode: '+str(mode))
+
+        return v_align
+
+# a uniform time array with time step step over the overlap of two sorted time arrays
+def common_time(time_a,time_b,step):
+    t_start = max(time_a[0],time_b[0])
+    t_end = min(time_a[-1],time_b[-1])
+    if t_end < t_start:
+        raise ValueError('time arrays do not overlap')
+
+    n_step = int(np.floor((t_end-t_start)/step)) + 1
+
+    return t_start + step*np.arange(n_step)
+
+# memo of discretized Rayleigh tables, keyed by (v_max, v_m, n)
+_rayleigh_memo = {}
+
+# discretized Rayleigh tables from the analytic cdf, F(v) = 1 - exp(-pi/4 * v**2/v_m**2)
+#   v_data: velocity of the intervals, [0.001, dv, 2dv, ..., v_max]
+#   pdf: probability of each interval ((k-1)dv, kdv]
+#   cdf: [0, F(dv), ..., F(v_max), 1.0]
+def _rayleigh_tables_(v_max,v_m,n):
+    key = (float(v_max),float(v_m),int(n))
+
+    if key not in _rayleigh_memo:
+        dv = v_max/n
+        v_k = dv*np.arange(n+1)
+
+        cdf_k = 1.0 - np.exp(-np.pi/4.0 * v_k**2/v_m**2)
+        pdf = np.diff(cdf_k)
+        cdf = np.append(cdf_k,1.0)
+
+        v_data = v_k.copy()
+        v_data[0] = 0.001 # set a minimal velocity of wind
+
+        for table in (pdf,v_data,cdf):
+            table.flags.writeable = False
+        _rayleigh_memo[key] = (pdf,v_data,cdf)
+
+    return _rayleigh_memo[key]
+
 # generate Rayleigh distribution wind data
 class wind_Rayleigh(wind_Data):
     def __init__(self,v_max,v_m,n,time=[],sTime=None,eTime=None,nData=None):
@@ -30,7 +109,6 @@ class wind_Rayleigh(wind_Data):
             step = (eTime - sTime)/nData
             eTime_new = eTime + step
             time = np.arange(sTime,eTime_new,step)
-            print (time)
 
         self.time = self.time + list(time) # time array
 
@@ -40,86 +118,50 @@ class wind_Rayleigh(wind_Data):
 
 
 
-    # Rayleigh probablity distribution function
+    # Rayleigh probablity distribution function (probability of each velocity interval)
     def _Rayleigh_(self):
-        pi = 3.141592653
-        dv = self.v_max/self.n
-        const = pi/2*dv**2/self.v_m**2 # constant in the distribution
-        pdf = []
-        for k in range(self.n):
-            idx = k+1 # k starts from 0, the first interval
-            v_exp = -pi/4 * idx**2 * dv**2/self.v_m**2
-            v_const = idx * const
-            pdf_k = v_const*math.exp(v_exp)
-
-            pdf.append(pdf_k)
-        self.pdf = self.pdf + pdf
-#        return pdf
+        pdf,v_data,cdf = _rayleigh_tables_(self.v_max,self.v_m,self.n)
+        self.pdf = pdf
 
     # calculate the velocity distribution
     def _v_dis_(self):
-        dv = self.v_max/self.n
-        v_data = []
-        v_data.append(0.001) # set a minimal velocity of wind
-        for k in range(self.n):
-            idx = k+1
-            vk = idx*dv
-            v_data.append(vk)
-
-        self.v_data = self.v_data + v_data
-#        return v_data
+        pdf,v_data,cdf = _rayleigh_tables_(self.v_max,self.v_m,self.n)
+        self.v_data = v_data
 
     # calcualte cumulated probability distribution
     def _cdf_cal_(self):
-        cdf = []
-        cdf.append(0.0)
-        for i in range(len(self.pdf)):
-           cdf_curr =  cdf[-1] + self. pdf[i]
-           cdf.append(cdf_curr)
-        cdf.append(1.0)
-
-        self.cdf = self.cdf + cdf
-
-    # generate a random wind velocity according to cdf
-    def _v_wind_(self):
-        seed = random.random()
-        cdf = []
-        for value in self.cdf:
-            cdf.append(value)
-        if seed <= self.cdf[1]:
-            v_wind = self.v_data[0] # set a minimal value for wind velocity
-        elif seed >= self.cdf[-2]:
-            v_wind = self.v_data[-1] # cover the range cannot be nomalized due to n number
-        else:                   # generate a wind volicity accoring to cdf
-            sort = cdf
-            sort.append(seed)
-            sort.sort()
-            idx = sort.index(seed)
-            if idx >= (len(self.v_data)):
-                print (idx)
-                print (seed)
-                print (sort)
-                print (len(sort))
-            v_wind = self.v_data[idx-1]
+        pdf,v_data,cdf = _rayleigh_tables_(self.v_max,self.v_m,self.n)
+        self.cdf = cdf
+
+    # convert uniform random numbers (seeds) into wind velocities according to cdf (inverse cdf)
+    def _v_wind_(self,seed):
+        cdf = np.asarray(self.cdf)
+        v_data = np.asarray(self.v_data)
+
+        # position of each seed in the sorted cdf (the trailing 1.0 is excluded)
+        idx = np.searchsorted(cdf[:-1],seed,side='left')
+        idx = np.clip(idx,1,len(v_data))
+        v_wind = v_data[idx-1]
+
+        v_wind = np.where(seed <= cdf[1], v_data[0], v_wind)     # set a minimal value for wind velocity
+        v_wind = np.where(seed >= cdf[-2], v_data[-1], v_wind)   # cover the range cannot be nomalized due to n number
 
         return v_wind
 
     # generate time dependent wind velocity curve
-    def _windCurve_(self):
-        wind = []
-        for i in range(len(self.time)):
-     #       print ('length cdf: ',len(self.cdf))
-            v_wind = wind_Rayleigh._v_wind_(self)
-            wind.append(v_wind)
-
-        self.wind = self.wind + wind
-
-    # main function to generate wind data
-    def genData(self):
-        wind_Rayleigh._Rayleigh_(self)
-        wind_Rayleigh._v_dis_(self)
-        wind_Rayleigh._cdf_cal_(self)
-        wind_Rayleigh._windCurve_(self)
+    def _windCurve_(self,rng):
+        seed = rng.random(len(self.time))
+        wind = wind_Rayleigh._v_wind_(self,seed)
+
+        self.wind = np.concatenate((self.wind,wind))
+
+    # main function to generate wind data, rng is a numpy random generator or a seed
+    def genData(self,rng=None):
+        if not isinstance(rng,np.random.Generator):
+            rng = np.random.default_rng(rng)
+
+        wind_Rayleigh._tables_(self)
+        wind_Rayleigh._windCurve_(self,rng)
 #        wind_Rayleigh._windData_(self)
 
 #        windData = self.windData
@@ -128,6 +170,33 @@ class wind_Rayleigh(wind_Data):
     
         return time,v_wind
 
+    # build the pdf, velocity and cdf tables once
+    def _tables_(self):
+        if len(self.cdf) == 0:
+            wind_Rayleigh._Rayleigh_(self)
+            wind_Rayleigh._v_dis_(self)
+            wind_Rayleigh._cdf_cal_(self)
+
+    # generate an ensemble of wind velocity curves, shape (n_scenario, n_time)
+    # phi is the AR(1) correlation between time steps (0.0 for independent samples),
+    # the correlated gaussian samples are mapped to uniform seeds by the normal cdf
+    def genEnsemble(self,n_scenario,rng=None,phi=0.0):
+        if not isinstance(rng,np.random.Generator):
+            rng = np.random.default_rng(rng)
+
+        wind_Rayleigh._tables_(self)
+
+        n_time = len(self.time)
+        if phi == 0.0:
+            seed = rng.random((n_scenario,n_time))
+        else:
+            z = ar1_process(rng.standard_normal((n_scenario,n_time)),phi)
+            seed = ndtr(z)
+
+        v_wind = wind_Rayleigh._v_wind_(self,seed)
+
+        return v_wind
+
     # plot wind velocity distribution probability
     def plt_v_dis(self):
         v_data = self.v_data[1:]
@@ -183,36 +252,76 @@ wind.plt_windData()
 print ('time is', time)
 print (v_wind)
 
+# 100 scenarios at once, correlated in time
+v_ensemble = wind.genEnsemble(100,rng=1,phi=0.9)
+print (v_ensemble.shape)
+
 """
 
 # class to read wind data
 class wind_readData(wind_Data):
 
-    def _readFile_(self,inFile):
-        time = []
-        wind = []
-        windData = []
-        with open (inFile,'r') as f:
-            content = f.readlines()
-        f.close()
-
-        for line in content:
-            try:
-                float(line.split()[0])
-                data = []
-                time.append(line.split()[0])
-                wind.append(line.split()[1])
-                data.append(line.split()[0])
-                data.append(line.split()[1])
-                windData.append(data)
-            except ValueError:
-                pass
-        
-        self.time = self.time + time
-        self.wind = self.wind + wind
-#        self.windData = self.windData + windData
-
-#        return windData
+    # read time and wind velocity (first two columns) of a whitespace separated file as float arrays
+    # lines not starting with a number (header, comments) are skipped
+    # a binary cache (inFile.npz) is kept next to the source file, and rebuilt when the source changes
+    def _readFile_(self,inFile,cache=True,chunkRows=100000):
+        data = None
+        if cache:
+            key = source_key(inFile)
+            arrays = load_cache(inFile,key)
+            if arrays is not None:
+                data = arrays['data']
+
+        if data is None:
+            data = wind_readData._parse_file_(self,inFile,chunkRows)
+            if cache:
+                save_cache(inFile,key,data=data)
+
+        time = data[:,0]
+        wind = data[:,1]
+
+        self.time = np.concatenate((self.time,time))
+        self.wind = np.concatenate((self.wind,wind))
+
+    # parse the file chunkRows lines at a time
+    def _parse_file_(self,inFile,chunkRows):
+        chunks = []
+        with open(inFile,'r') as f:
+            while True:
+                lines = list(itertools.islice(f,chunkRows))
+                if len(lines) == 0:
+                    break
+                chunk = None
+                if wind_readData._is_data_(lines[0]):
+                    try:
+                        chunk = np.loadtxt(lines,usecols=(0,1),ndmin=2)
+                    except ValueError:
+                        pass
+                if chunk is None:
+                    # the chunk contains header or comment lines, chunks without data are skipped
+                    lines = [line for line in lines if wind_readData._is_data_(line)]
+                    if len(lines) == 0:
+                        continue
+                    chunk = np.loadtxt(lines,usecols=(0,1),ndmin=2)
+                chunks.append(chunk)
+
+        if len(chunks) == 0:
+            return np.empty((0,2))
+
+        return np.concatenate(chunks)
+
+    # check whether a line is a data line
+    def _is_data_(line):
+        words = line.split()
+        if len(words) < 2:
+            return False
+        try:
+            float(words[0])
+            float(words[1])
+        except ValueError:
+            return False
+
+        return True
 
     # plot time dependent wind velocity
     def plt_windData(self): 
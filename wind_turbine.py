@@ -6,10 +6,13 @@
 # Last Modified Date: 09.08.2020
 # Last Modified By  : tzhang
 
+import os
 import math
 import numpy as np
 from matplotlib import pyplot as plt
 
+from file_cache import source_key, load_cache, save_cache
+
 """
 REFERENCES:
     - Heier, Siegfried, and Rachel Waddington. Grid Integration of Wind Energy Conversion Systems. Chichester, England: Wiley, 2014. Print.
@@ -23,6 +26,9 @@ a module simulate wind turbine
 
 """
 
+# memo of turbine power tables, keyed by turbine parameters, air density and cp curve
+_power_tables = {}
+
 class wind_Turbine:
     # parameters describing a wind turbine
     def __init__(self, d_wing, J_turbine, h_hub, P_lim, cut_in, cut_out):
@@ -37,55 +43,280 @@ class wind_Turbine:
         self.energy = []           # total energy in wind
         self.p_out = []            # wind turbine output power
 
-    # calculate energy in wind
+    # wind velocity at the hub height from the velocity v_ref measured at the height h_ref (in m)
+    #   law 'power': v_ref*(h_hub/h_ref)**alpha, alpha = 1/7 for open land
+    #   law 'log': v_ref*ln(h_hub/z0)/ln(h_ref/z0), z0 is the roughness length (in m)
+    def v_hub(self, v_ref, h_ref, law='power', alpha=1./7., z0=0.03):
+        v_ref = np.asarray(v_ref,dtype=float)
+
+        if law == 'power':
+            factor = (self.h_hub/h_ref)**alpha
+        elif law == 'log':
+            factor = math.log(self.h_hub/z0)/math.log(h_ref/z0)
+        else:
+            raise ValueError('unknown wind shear law: '+str(law))
+
+        return v_ref*factor
+
+    # calculate energy in wind, v_wind can be an array of any shape (e.g. scenario x time)
     def _P_wind_(self, dens_air, time, v_wind): #  dens_air is the density of air, d_wing is the diameter of the turbine
-        energy = []
         pi = 3.141592653 # pi constant
-        for i in range(len(time)):
-            Pw = 1./2. * dens_air * pi* self.d_wing**2/4. * v_wind[i]**3
-            energy.append(Pw)
+        v_wind = np.asarray(v_wind,dtype=float)
+        energy = 1./2. * dens_air * pi* self.d_wing**2/4. * np.float_power(v_wind,3)
 
-        self.energy = self.energy + energy
+        self.energy = wind_Turbine._record_(self.energy,energy)
 
         return energy
 
     # calculate theoretical wind turbine output power
     def _P_harvest_(self,Pw,cp):        # calculate the harvest wind energy of a wind turbine
-       # print (self.P_lim)
         P = Pw * cp           # harvest power is the product of wind power and wind turbine efficiency 
-       # print (P)
-        P = min(self.P_lim,P)
-       # print (P)
+        P = np.minimum(self.P_lim,P)
 
-#        self.P0 = self.P0 + Power
         return P
 
-    # calculate wind turbine output power
+    # calculate wind turbine output power, in MW, zero outside of (cut_in, cut_out)
     def P_output(self, dens_air, time, v_wind, cp):
+        v_wind = np.asarray(v_wind,dtype=float)
+        cp = np.asarray(cp,dtype=float)
+
         energy = wind_Turbine._P_wind_(self,dens_air,time,v_wind)
+        power = wind_Turbine._P_cut_(self,v_wind,wind_Turbine._P_harvest_(self,energy,cp))
 
-        power = []
-        for i in range(len(time)):
-            if v_wind[i] <=  self.cut_in:
-                wPower = 0.0
-            elif v_wind[i] >= self.cut_out:
-                wPower = 0.0
-            else:
-              #  print (v_wind[i],cp[i])
-                wPower = wind_Turbine._P_harvest_(self,energy[i],cp[i])
-                wPower = wPower/1E6     # convert to MW
-            power.append(wPower)
+        self.p_out = wind_Turbine._record_(self.p_out,power)
+
+        return power
 
-        self.p_out = self.p_out + power
+    # convert harvested power to MW, zero outside of (cut_in, cut_out)
+    def _P_cut_(self,v_wind,P):
+        power = P/1E6     # convert to MW
+        working = (v_wind > self.cut_in) & (v_wind < self.cut_out)
+        power = np.where(working,power,0.0)
 
         return power
 
+    # calculate wind turbine output power (MW) without records
+    def _P_curve_(self,dens_air,v_wind,cp):
+        pi = 3.141592653 # pi constant
+        energy = 1./2. * dens_air * pi* self.d_wing**2/4. * np.float_power(v_wind,3)
+        power = wind_Turbine._P_cut_(self,v_wind,wind_Turbine._P_harvest_(self,energy,cp))
+
+        return power
+
+    # tabulate the output power (MW) against wind velocity, on a uniform grid of step dv up to v_max
+    # cells containing a jump or kink of the power curve (cp knots, cut in/out, power limit) are flagged
+    # tables are shared by all turbines with the same parameters, air density and cp curve
+    def power_table(self,dens_air,cp_curve,dv=0.01,v_max=40.0,mode='step'):
+        key = (self.d_wing,self.P_lim,self.cut_in,self.cut_out,float(dens_air),\
+                tuple(cp_curve.wind),tuple(cp_curve.cp),float(dv),float(v_max),mode)
+
+        if key not in _power_tables:
+            n_cell = int(round(v_max/dv))
+            v_grid = dv*np.arange(n_cell+1)
+
+            cp = cp_curve.cp_array(v_grid,mode)
+            p_grid = wind_Turbine._P_curve_(self,dens_air,v_grid,cp)
+
+            jump = np.zeros(n_cell,dtype=bool)
+            knots = np.concatenate((cp_curve.wind,[self.cut_in,self.cut_out]))
+            idx = (knots/dv).astype(int)
+            for shift in (-1,0):
+                jump[np.clip(idx+shift,0,n_cell-1)] = True
+            # kinks where the power limit starts or stops
+            at_lim = p_grid >= self.P_lim/1E6
+            jump = jump | (at_lim[:-1] != at_lim[1:])
+
+            p_grid.flags.writeable = False
+            jump.flags.writeable = False
+            _power_tables[key] = (p_grid,jump)
+
+        return _power_tables[key]
+
+    # calculate wind turbine output power (MW) from the power table, v_wind of any shape
+    # linear interpolation between the two nearest table velocities (a gather on the uniform grid),
+    # velocities in flagged cells and beyond v_max are calculated directly
+    def P_output_table(self,dens_air,v_wind,cp_curve,dv=0.01,v_max=40.0,mode='step'):
+        if np.ndim(dens_air) > 0:
+            # a density series (air.ideal) has no single table, the curve is calculated directly
+            v_wind = np.asarray(v_wind,dtype=float)
+            power = wind_Turbine._P_curve_(self,dens_air,v_wind,cp_curve.cp_array(v_wind,mode))
+            self.p_out = wind_Turbine._record_(self.p_out,power)
+            return power
+
+        p_grid,jump = wind_Turbine.power_table(self,dens_air,cp_curve,dv,v_max,mode)
+        v_wind = np.asarray(v_wind,dtype=float)
+
+        x = np.clip(v_wind/dv,0.0,len(p_grid)-1)
+        idx = np.minimum(x.astype(int),len(jump)-1)
+        frac = x - idx
+        power = p_grid[idx] + frac*(p_grid[idx+1] - p_grid[idx])
+
+        direct = jump[idx] | (v_wind > v_max)
+        if direct.any():
+            v_direct = v_wind[direct]
+            power[direct] = wind_Turbine._P_curve_(self,dens_air,v_direct,cp_curve.cp_array(v_direct,mode))
+
+        self.p_out = wind_Turbine._record_(self.p_out,power)
+
+        return power
+
+    # calculate wind turbine output power (MW) with the rotor inertia J_turbine
+    #   the rotor kinetic energy E = J*omega**2/2 follows dE/dt = P_aero - P_gen, with the generator
+    #   power P_gen = P_lim*(omega/omega_rated)**3 (optimal torque control) and the rotor speed limited
+    #   to omega_rated = v_tip/(d_wing/2) (pitch control); outside of (cut_in, cut_out) the rotor is parked
+    #   each time step (time in min) is integrated with fixed explicit Euler substeps, the output is the
+    #   mean generator power of the step; v_wind and cp have time along the last axis
+    def P_output_dynamic(self, dens_air, time, v_wind, cp, v_tip=80.0, omega_ini=None, tol=1e-9):
+        v_wind = np.asarray(v_wind,dtype=float)
+        cp = np.asarray(cp,dtype=float)
+        time = np.asarray(time,dtype=float)
+
+        energy = wind_Turbine._P_wind_(self,dens_air,time,v_wind)
+        working = (v_wind > self.cut_in) & (v_wind < self.cut_out)
+        P_aero = np.where(working,np.maximum(energy*cp,0.0),0.0)
+
+        omega_rated = v_tip/(self.d_wing/2.)
+        E_rated = 1./2. * self.J_turbine * omega_rated**2
+
+        # state e = E/E_rated in [0,1], de/dt = a - c*e**1.5
+        a = P_aero/E_rated
+        c = self.P_lim/E_rated
+
+        # step lengths in s, the last step repeats the one before
+        dt = np.diff(time)*60.
+        dt = np.append(dt,dt[-1] if len(dt) > 0 else 0.0)
+        # substep not longer than the time constant at rated speed: no overshoot, e stays >= 0
+        n_sub = max(1,int(math.ceil(dt.max()*1.5*c)))
+        h = dt/n_sub
+
+        # initial guess: equilibrium at each step
+        e_end = np.minimum(1.0,np.cbrt(np.minimum(P_aero/self.P_lim,1.0))**2)
+        if omega_ini is None:
+            e_ini = e_end[...,0]
+        else:
+            e_ini = np.minimum(1.0,(np.asarray(omega_ini,dtype=float)/omega_rated)**2)
+        e_ini = np.broadcast_to(e_ini,e_end.shape[:-1]).ravel()
+
+        # steps are integrated in parallel from the end states of the previous sweep (waveform
+        # relaxation), each sweep repeats only the steps whose start state has changed; sweep n is
+        # exact for the first n steps, the rotor forgets its initial state within a few steps
+        shape = e_end.shape
+        n_time = shape[-1]
+        e_end = e_end.ravel()
+        a = np.broadcast_to(a,shape).ravel()
+        h = np.broadcast_to(h,shape).ravel()
+        working = np.broadcast_to(working,shape).ravel()
+        p_sum = np.zeros(e_end.shape)
+
+        idx = np.arange(e_end.size)
+        while idx.size > 0:
+            first = idx % n_time == 0
+            e = np.where(first,e_ini[idx//n_time],e_end[idx-1])
+            e = np.where(working[idx],e,0.0)
+            a_i = a[idx]
+            h_i = h[idx]
+            p_i = np.zeros(idx.size)
+            for k in range(n_sub):
+                p_gen = e*np.sqrt(e)
+                p_i += p_gen
+                e = np.clip(e + h_i*(a_i - c*p_gen),0.0,1.0)
+            e = np.where(working[idx],e,0.0)
+
+            changed = np.abs(e - e_end[idx]) > tol
+            e_end[idx] = e
+            p_sum[idx] = p_i
+
+            # the next steps of the changed ones start from a new state
+            idx = idx[changed & (idx % n_time != n_time-1)] + 1
+
+        working = working.reshape(shape)
+        p_sum = p_sum.reshape(shape)
+
+        power = np.where(working,self.P_lim*p_sum/n_sub,0.0)/1E6     # convert to MW
+
+        self.p_out = wind_Turbine._record_(self.p_out,power)
+
+        return power
+
+    # append data to the records along the time axis, records restart if the scenario axis changes
+    def _record_(records,data):
+        if len(records) == 0 or np.shape(records)[:-1] != np.shape(data)[:-1]:
+            return data
+        else:
+            return np.concatenate((records,data),axis=-1)
+
+
+
+# slopes at the knots of a monotone piecewise cubic hermite interpolation (Fritsch-Carlson)
+def pchip_slopes(x,y):
+    x = np.asarray(x,dtype=float)
+    y = np.asarray(y,dtype=float)
+
+    h = np.diff(x)
+    delta = np.diff(y)/h
+
+    slope = np.zeros(len(x))
+    if len(x) == 2:
+        slope[:] = delta[0]
+        return slope
+
+    # interior knots: weighted harmonic mean of the secant slopes, zero at local extrema
+    w1 = 2*h[1:] + h[:-1]
+    w2 = h[1:] + 2*h[:-1]
+    same_sign = delta[:-1]*delta[1:] > 0
+    with np.errstate(divide='ignore',invalid='ignore'):
+        hmean = (w1+w2)/(w1/delta[:-1] + w2/delta[1:])
+    slope[1:-1] = np.where(same_sign,hmean,0.0)
+
+    # end knots: non-centered three point formula, limited to keep the shape
+    slope[0] = _pchip_end_(h[0],h[1],delta[0],delta[1])
+    slope[-1] = _pchip_end_(h[-1],h[-2],delta[-1],delta[-2])
+
+    return slope
+
+# slope at an end knot of pchip interpolation
+def _pchip_end_(h0,h1,delta0,delta1):
+    d = ((2*h0 + h1)*delta0 - h0*delta1)/(h0 + h1)
+    if np.sign(d) != np.sign(delta0):
+        d = 0.0
+    elif np.sign(delta0) != np.sign(delta1) and abs(d) > abs(3*delta0):
+        d = 3*delta0
+
+    return d
+
+# evaluate piecewise cubic hermite interpolation, values outside of the knots take the first or last y
+def pchip_eval(x,y,slope,xq):
+    x = np.asarray(x,dtype=float)
+    y = np.asarray(y,dtype=float)
+    xq = np.asarray(xq,dtype=float)
+
+    xc = np.clip(xq,x[0],x[-1])
+    k = np.clip(np.searchsorted(x,xc,side='right') - 1, 0, len(x)-2)
+
+    h = x[k+1] - x[k]
+    t = (xc - x[k])/h
+    t2 = t*t
+    t3 = t2*t
+
+    h00 = 2*t3 - 3*t2 + 1
+    h10 = t3 - 2*t2 + t
+    h01 = -2*t3 + 3*t2
+    h11 = t3 - t2
+
+    yq = h00*y[k] + h10*h*slope[k] + h01*y[k+1] + h11*h*slope[k+1]
 
+    return yq
+
+
+# fitted curves of manufacturer files, shared by all cp_IEC objects of a run
+#   key: (file, modification time, size, curve type, rotor diameter, air density, unit)
+_curve_memo = {}
 
 class cp_IEC:
     def __init__(self):
         self.wind = []
         self.cp = []
+        self.slope = None   # pchip slopes of a fitted curve file, None to fit at evaluation
 
     # a reference curve taken from IEC standard
     def curve_A(self):
@@ -102,30 +333,101 @@ class cp_IEC:
         self.wind = self.wind + wind 
         self.cp = self.cp + cp
 
+    # a manufacturer curve read from a csv file (columns: wind velocity in m/s, cp or power)
+    #   curve_type 'cp': the second column is cp
+    #   curve_type 'power': the second column is the electric power in unit W (default kW),
+    #                       converted to cp with the rotor diameter d_wing and the air density dens_air
+    #   the fitted curve (knots and pchip slopes) is kept in a binary cache next to the file
+    def curve_file(self,inFile,curve_type='cp',d_wing=None,dens_air=1.225,unit=1.0E3,cache=True):
+        if curve_type not in ('cp','power'):
+            raise ValueError('unknown curve type: '+str(curve_type))
+        if curve_type == 'power' and d_wing is None:
+            raise ValueError('d_wing is needed to convert a power curve to cp')
+
+        if curve_type == 'cp':
+            key = source_key(inFile,curve_type)
+        else:
+            key = source_key(inFile,curve_type,float(d_wing),float(dens_air),float(unit))
+
+        memo_key = (os.path.abspath(inFile),) + key
+        curve = _curve_memo.get(memo_key)
+        if curve is None:
+            if cache:
+                arrays = load_cache(inFile,key)
+                if arrays is not None:
+                    curve = (arrays['wind'],arrays['cp'],arrays['slope'])
+            if curve is None:
+                wind,value = cp_IEC._read_curve_(self,inFile)
+                curve = cp_IEC._fit_curve_(self,wind,value,curve_type,d_wing,dens_air,unit)
+                if cache:
+                    save_cache(inFile,key,wind=curve[0],cp=curve[1],slope=curve[2])
+            _curve_memo[memo_key] = curve
+
+        wind,cp,slope = curve
+        self.wind = wind.tolist()
+        self.cp = cp.tolist()
+        self.slope = slope
+
+    # read the two columns of a curve file, a header line is skipped
+    def _read_curve_(self,inFile):
+        try:
+            data = np.loadtxt(inFile,delimiter=',',usecols=(0,1),ndmin=2)
+        except ValueError:
+            data = np.loadtxt(inFile,delimiter=',',usecols=(0,1),ndmin=2,skiprows=1)
+
+        order = np.argsort(data[:,0],kind='stable')
+        data = data[order]
+        if len(data) < 2 or np.any(np.diff(data[:,0]) <= 0.0):
+            raise ValueError('wind velocities of a curve must be distinct, at least two: '+inFile)
+
+        return data[:,0],data[:,1]
+
+    # convert to cp and fit the pchip slopes once
+    def _fit_curve_(self,wind,value,curve_type,d_wing,dens_air,unit):
+        if curve_type == 'power':
+            # knots at zero wind carry no information on cp
+            keep = wind > 0.0
+            wind = wind[keep]
+            pi = 3.141592653 # pi constant, as in wind_Turbine
+            P_wind = 1./2. * dens_air * pi* d_wing**2/4. * np.float_power(wind,3)
+            cp = value[keep]*unit/P_wind
+        else:
+            cp = value
+
+        slope = pchip_slopes(wind,cp)
+
+        return wind,cp,slope
+
     # determine the cp value according to wind velocity
     def _cp_value_(self,wind_velocity):
-        wind = []
-        for value in self.wind:
-            wind.append(value)
-
-        sort = wind
-        if wind_velocity in wind:
-            idx = wind.index(wind_velocity)
-            cp = self.cp[idx]
-        else:
-            sort.append(wind_velocity)
-            sort.sort()
-            idx = sort.index(wind_velocity)
-            cp = self.cp[idx-1]
+        cp = cp_IEC.cp_array(self,[wind_velocity])[0]
 
         return cp
 
-    # determine the array of cp
-    def cp_array(self, v_wind):
-        cp_array = []
-        for i in range(len(v_wind)):
-            cp = cp_IEC._cp_value_(self,v_wind[i])
-            cp_array.append(cp)
+    # determine the array of cp, v_wind can be an array of any shape
+    #   mode 'step': cp of the last knot at or below the wind velocity
+    #   mode 'linear': linear interpolation between knots
+    #   mode 'pchip': monotone piecewise cubic (Fritsch-Carlson) interpolation between knots
+    #   in 'linear' and 'pchip' mode, velocities outside of the curve take the cp of the first or last knot
+    def cp_array(self, v_wind, mode='step'):
+        wind = np.asarray(self.wind,dtype=float)
+        cp = np.asarray(self.cp,dtype=float)
+        v_wind = np.asarray(v_wind,dtype=float)
+
+        if mode == 'step':
+            # below the first knot the index is -1, the cp of the last knot (as the sorted list lookup)
+            idx = np.searchsorted(wind,v_wind,side='right') - 1
+            cp_array = cp[idx]
+        elif mode == 'linear':
+            cp_array = np.interp(v_wind,wind,cp)
+        elif mode == 'pchip':
+            if self.slope is not None and len(self.slope) == len(wind):
+                slope = self.slope
+            else:
+                slope = pchip_slopes(wind,cp)
+            cp_array = pchip_eval(wind,cp,slope,v_wind)
+        else:
+            raise ValueError('unknown cp interpolation mode: '+str(mode))
 
         return cp_array
 
@@ -197,6 +499,35 @@ print (wP_out)
 
 """    
 
+# intermittence factor of a wind farm, the energy output relative to the output at installed capacity P_cap
+#   p_farm_array: time along the last axis, leading axes (e.g. scenarios) give an array of factors
+#   method 'left': left Riemann sum, the power of a step holds until the next time point
+#   method 'trapz': trapezoid rule between time points
+def f_inter_cal(p_farm_array,time,P_cap,method='left'):
+    p_farm_array = np.asarray(p_farm_array,dtype=float)
+    time = np.asarray(time,dtype=float)
+
+    # wind farm output limit during period
+    energy_lim = P_cap * time[...,-1]
+
+    # calculate energy output during the period
+    dt = np.diff(time,axis=-1)
+    if method == 'left':
+        energy_output = np.sum(p_farm_array[...,:-1]*dt,axis=-1)
+    elif method == 'trapz':
+        energy_output = np.sum(0.5*(p_farm_array[...,:-1] + p_farm_array[...,1:])*dt,axis=-1)
+    else:
+        raise ValueError('unknown integration method: '+str(method))
+
+    # calculate intermittence factor
+    with np.errstate(divide='ignore',invalid='ignore'):
+        f_inter = np.where(energy_lim == 0.0,0.0,energy_output/energy_lim)
+
+    if f_inter.ndim == 0:
+        f_inter = float(f_inter)
+
+    return f_inter
+
 """
 
 a module simulate wind farm                                 
@@ -212,31 +543,15 @@ class wind_farm:
 
         return P_output
 
-    # calculate the power array
+    # calculate the power array, p_unit_array can be an array of any shape (e.g. scenario x time)
     def pArray(self,p_unit_array):
-        p_farm_array = []
-        for p_unit in p_unit_array:
-            p_farm = wind_farm._p_out_(self,p_unit)
-            p_farm_array.append(p_farm)
+        p_farm_array = wind_farm._p_out_(self,np.asarray(p_unit_array,dtype=float))
 
         return p_farm_array
 
-    # calculate wind farm intermittence factor
-    def cal_f_inter(self, p_farm_array,time,P_lim):
-        # wind farm output limit during period
-        energy_lim = P_lim * self.n_unit * time[-1]
-
-        # calculate energy output during the period
-        energy_output = 0.0
-        for i in range(1,len(time)):
-            energy = p_farm_array[i-1] * (time[i] - time[i-1])
-            energy_output = energy_output + energy
-
-        # calculate intermittence factor
-        if energy_lim == 0.0:
-            f_inter = 0.0
-        else:
-            f_inter = energy_output/energy_lim
+    # calculate wind farm intermittence factor, P_lim is the power limit of a turbine
+    def cal_f_inter(self, p_farm_array,time,P_lim,method='left'):
+        f_inter = f_inter_cal(p_farm_array,time,P_lim*self.n_unit,method)
 
         return f_inter
 
@@ -257,19 +572,15 @@ class wind_farm:
         return f_inter_array
 
 
-    # calculate lifetime average  wind farm intermittence factor
+    # calculate lifetime average  wind farm intermittence factor, years without wind farm are not counted
     def cal_f_inter_ave(f_inter_array):
+        f_inter_array = np.asarray(f_inter_array,dtype=float)
+        f_op = f_inter_array[f_inter_array != 0.0]
 
-        num_year = 0.
-        sum_f = 0.0
-
-        for i in range(len(f_inter_array)):
-
-            if f_inter_array != 0.0:
-                sum_f = sum_f + f_inter_array[i]
-                num_year = num_year + 1.
-
-        f_inter_ave = sum_f/num_year
+        if len(f_op) == 0:
+            f_inter_ave = 0.0
+        else:
+            f_inter_ave = float(np.mean(f_op))
 
         return f_inter_ave
 
@@ -290,6 +601,85 @@ class wind_farm:
         plt.savefig(pltName,dpi = 100)
 
 
+class wind_farm_mix:
+    # a wind farm of several turbine types, parameters are arrays with one entry per type
+    #   cp_curves: list of cp_IEC curves, cp_id: index in cp_curves of the curve of each type
+    #   n_unit: number of turbines of each type
+    def __init__(self, d_wing, P_lim, cut_in, cut_out, cp_id, n_unit, cp_curves):
+        d_wing,P_lim,cut_in,cut_out,cp_id,n_unit = np.broadcast_arrays(\
+                np.atleast_1d(d_wing),np.atleast_1d(P_lim),np.atleast_1d(cut_in),\
+                np.atleast_1d(cut_out),np.atleast_1d(cp_id),np.atleast_1d(n_unit))
+
+        self.d_wing = d_wing.astype(float)      # diameter of the turbines
+        self.P_lim = P_lim.astype(float)*1e6    # power limit of the turbines, in W
+        self.cut_in = cut_in.astype(float)      # cut in velocity of the turbines
+        self.cut_out = cut_out.astype(float)    # cut out velocity of the turbines
+        self.cp_id = cp_id.astype(int)          # cp curve of the turbines
+        self.n_unit = n_unit.astype(float)      # number of turbines of each type
+
+        self.cp_curves = list(cp_curves)
+        if np.any(self.cp_id < 0) or np.any(self.cp_id >= len(self.cp_curves)):
+            raise ValueError('cp_id out of range of the cp curves')
+
+        self.n_type = len(self.n_unit)
+
+    # reshape a per type array to broadcast against v_wind of ndim dimensions
+    def _expand_(self,a,ndim):
+        return a.reshape((self.n_type,) + (1,)*ndim)
+
+    # output power (MW) of one turbine of each type, shape (n_type,) + shape of the wind velocity
+    #   v_wind: one array shared by all types, or per_type=True with the type along the first axis
+    #   dens_air: a constant or an array broadcasting against v_wind
+    def p_unit(self, dens_air, v_wind, mode='step', per_type=False):
+        v_wind = np.asarray(v_wind,dtype=float)
+        if per_type:
+            if v_wind.shape[0] != self.n_type:
+                raise ValueError('first axis of v_wind must be the turbine type')
+            shape = v_wind.shape[1:]
+        else:
+            shape = v_wind.shape
+        ndim = len(shape)
+
+        # cp of each type, every curve is evaluated once for the types using it
+        cp = np.empty((self.n_type,) + shape)
+        for i,curve in enumerate(self.cp_curves):
+            rows = self.cp_id == i
+            if not np.any(rows):
+                continue
+            v = v_wind[rows] if per_type else v_wind
+            cp[rows] = curve.cp_array(v,mode)
+
+        pi = 3.141592653 # pi constant
+        d_wing = wind_farm_mix._expand_(self,self.d_wing,ndim)
+        energy = 1./2. * dens_air * pi* d_wing**2/4. * np.float_power(v_wind,3)
+        P = np.minimum(wind_farm_mix._expand_(self,self.P_lim,ndim),energy*cp)
+
+        power = P/1E6     # convert to MW
+        working = (v_wind > wind_farm_mix._expand_(self,self.cut_in,ndim)) & \
+                (v_wind < wind_farm_mix._expand_(self,self.cut_out,ndim))
+        power = np.where(working,power,0.0)
+
+        return power
+
+    # total output power (MW) of the wind farm, shape of the wind velocity (without the type axis)
+    def pArray(self, dens_air, v_wind, mode='step', per_type=False):
+        p_unit = wind_farm_mix.p_unit(self,dens_air,v_wind,mode,per_type)
+        n_unit = wind_farm_mix._expand_(self,self.n_unit,p_unit.ndim-1)
+        p_farm_array = np.sum(n_unit*p_unit,axis=0)
+
+        return p_farm_array
+
+    # installed capacity of the wind farm, in MW
+    def P_cap(self):
+        return float(np.sum(self.n_unit*self.P_lim))/1E6
+
+    # calculate wind farm intermittence factor, relative to the installed capacity of all types
+    def cal_f_inter(self, p_farm_array, time, method='left'):
+        f_inter = f_inter_cal(p_farm_array,time,wind_farm_mix.P_cap(self),method)
+
+        return f_inter
+
+
 """
 class test
 